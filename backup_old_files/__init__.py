@@ -8,9 +8,25 @@ from aqt import mw, gui_hooks
 from aqt.qt import *
 from aqt.qt import QWebChannel, pyqtSlot
 from aqt.utils import showInfo, showWarning
-from aqt.reviewer import Reviewer
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, request, jsonify, render_template_string, stream_with_context
 from flask_cors import CORS
+from werkzeug.serving import make_server
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None  # WebSocket audio endpoint is disabled without flask-sock
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Fall back to the stdlib json encoder
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None  # clean_html falls back to html2text
+try:
+    import msgpack
+except ImportError:
+    msgpack = None  # Hot review endpoints answer in JSON only
 import threading
 import json
 import logging
@@ -19,20 +35,28 @@ import sqlite3
 import requests
 import hashlib
 import hmac
+import http.client
+import secrets
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List, Tuple
 import html2text
 import re
 from dataclasses import dataclass, asdict
 from enum import Enum
+from types import MappingProxyType
+from bisect import bisect_right
+from functools import lru_cache, partial, wraps
+from itertools import islice
 import asyncio
 import websockets
 import base64
+import random
 import time
-from concurrent.futures import ThreadPoolExecutor
+import queue
 
 # Configure logging
 log_file = os.path.join(mw.addonManager.addonsFolder(__name__), 'voice_review.log')
+log_url = QUrl.fromLocalFile(log_file)  # Opened by the "View Logs" menu action
 logging.basicConfig(
     level=logging.DEBUG,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -43,9 +67,188 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Read-only stand-in when the add-on has no stored config yet
+EMPTY_CONFIG = MappingProxyType({})
+
 # ElevenLabs Agent Configuration
 ELEVENLABS_AGENT_ID = "agent_5301k0wccfefeaxtkqr0kce7v66a"
 
+# Immediate feedback for commands spotted in partial transcripts
+QUICK_RESPONSES = {
+    'next': "Getting next card...",
+    'answer': "Showing answer...",
+    'hint': "Generating hint...",
+    'again': "Marked as 'again'",
+    'good': "Marked as 'good'",
+    'easy': "Marked as 'easy'",
+    'hard': "Marked as 'hard'"
+}
+QUICK_COMMAND_RE = re.compile(r'\b(' + '|'.join(QUICK_RESPONSES) + r')\b')
+
+# Fallback intent keywords, checked in priority order; one compiled
+# alternation per intent so each check is a single scan of the message
+INTENT_PATTERNS = tuple(
+    (intent, re.compile(r'\b(?:' + '|'.join(map(re.escape, keywords)) + r')\b'))
+    for intent, keywords in (
+        ('next_card', ['next', 'continue', 'another', 'more']),
+        ('show_answer', ['answer', 'solution', 'reveal', 'show', 'tell me']),
+        ('get_hint', ['hint', 'help', 'clue', 'tip']),
+        ('rate_card', ['again', 'hard', 'good', 'easy', 'difficult', 'correct', 'wrong']),
+        ('pause', ['pause', 'stop', 'break', 'wait']),
+        ('resume', ['resume', 'continue', 'back', 'unpause']),
+        ('statistics', ['stats', 'statistics', 'progress', 'how am i doing']),
+        ('end_session', ['end', 'finish', 'done', 'quit', 'stop session'])
+    )
+)
+
+# Expanded rating mappings for natural language
+EASE_MAP = {
+    # Standard ratings
+    'again': 1, 'hard': 2, 'good': 3, 'easy': 4,
+    # Natural variations
+    'repeat': 1, 'forgot': 1, 'missed': 1, 'no': 1, 'incorrect': 1, 'wrong': 1,
+    'difficult': 2, 'struggled': 2, 'almost': 2, 'partial': 2, 'tough': 2,
+    'correct': 3, 'yes': 3, 'got it': 3, 'remembered': 3, 'right': 3, 'ok': 3,
+    'perfect': 4, 'instant': 4, 'obvious': 4, 'simple': 4, 'trivial': 4
+}
+VALID_RATINGS = list(EASE_MAP)
+
+# Encouragement per ease (index ease - 1); {rating} is filled in only for the pick
+FEEDBACK_MESSAGES = (
+    (
+        "No worries! Marked as '{rating}'. Everyone forgets sometimes.",
+        "That's okay! We'll see this one again soon.",
+        "Don't worry about it. Repetition is how we learn!"
+    ),
+    (
+        "Good effort! Marked as '{rating}'.",
+        "Nice try! You're getting there.",
+        "Keep working on it. You're making progress!"
+    ),
+    (
+        "Well done! Marked as '{rating}'.",
+        "Great job! You got it!",
+        "Excellent! Your memory is working well."
+    ),
+    (
+        "Perfect! Marked as '{rating}'.",
+        "Outstanding! That was easy for you.",
+        "Brilliant! You've mastered this one."
+    )
+)
+
+# Review interval (days) -> spoken age; INTERVAL_PHRASES[i] covers intervals
+# below INTERVAL_THRESHOLDS[i], as (template, days per unit)
+INTERVAL_THRESHOLDS = (1, 2, 7, 21, 365)
+INTERVAL_PHRASES = (
+    ("Review card from {n} days ago", 1),
+    ("Review card from yesterday", 1),
+    ("Review card from {n} days ago", 1),
+    ("Review card from about {n} week{s} ago", 7),
+    ("Mature card from about {n} month{s} ago", 30),
+    ("Very mature card from about {n} year{s} ago", 365)
+)
+
+# Card text cleanup for speech
+CLOZE_RE = re.compile(r'\{\{c\d+::(.*?)\}\}')
+SPEECH_SPACE_RE = re.compile(r'(?:\s|&nbsp;)+')
+
+def percent(part: int, whole: int) -> int:
+    """Whole-number percentage, rounded half up, in integer arithmetic"""
+    return (200 * part + whole) // (2 * whole) if whole else 0
+
+def json_default(obj):
+    """Encode the enums and durations that end up in response payloads"""
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, timedelta):
+        return obj.total_seconds()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+if orjson is not None:
+    from flask.json.provider import DefaultJSONProvider
+
+    class OrjsonProvider(DefaultJSONProvider):
+        """Flask JSON provider backed by orjson, used by jsonify and request.json"""
+        
+        @staticmethod
+        def default(obj):
+            # orjson encodes enums itself; Flask's fallback covers Decimal and friends
+            if isinstance(obj, timedelta):
+                return obj.total_seconds()
+            return DefaultJSONProvider.default(obj)
+        
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+        
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(
+                orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS),
+                mimetype=self.mimetype
+            )
+
+    def dumps_json(obj) -> bytes:
+        """Serialize obj straight to UTF-8 JSON bytes"""
+        return orjson.dumps(obj, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+
+    loads_json = orjson.loads
+else:
+    OrjsonProvider = None
+
+    def dumps_json(obj) -> bytes:
+        """Serialize obj straight to UTF-8 JSON bytes"""
+        return json.dumps(obj, default=json_default).encode('utf-8')
+
+    loads_json = json.loads
+
+def json_body_response(body: bytes, status: int = 200) -> Response:
+    """Wrap an already-serialized JSON body in a response"""
+    return Response(body, status=status, mimetype='application/json')
+
+def json_response(payload, status: int = 200) -> Response:
+    """Serialize payload directly, bypassing jsonify's argument handling"""
+    return json_body_response(dumps_json(payload), status)
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+def negotiated_response(payload, status: int = 200) -> Response:
+    """Serialize payload as msgpack when the client asks for it, JSON otherwise"""
+    if msgpack and MSGPACK_MIMETYPE in request.headers.get('Accept', ''):
+        body = msgpack.packb(payload, use_bin_type=True, default=json_default)
+        return Response(body, status=status, mimetype=MSGPACK_MIMETYPE)
+    return json_response(payload, status)
+
+def json_errors(context: str):
+    """Turn an unexpected exception in a handler into a logged 500 JSON reply"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                logger.error("%s: %s", context, e, exc_info=True)
+                return json_response({"success": False, "error": str(e)}, 500)
+        return wrapper
+    return decorator
+
+# Fixed error bodies, serialized once at import
+NOT_FOUND_BODY = dumps_json({"success": False, "error": "Endpoint not found"})
+INTERNAL_ERROR_BODY = dumps_json({"success": False, "error": "Internal server error"})
+INVALID_SIGNATURE_BODY = dumps_json({"error": "Invalid webhook signature"})
+RATE_LIMITED_BODY = dumps_json({"error": "Rate limit exceeded"})
+
+# Conversation webhook failure reply; kept as a dict so it is sent in
+# whichever format the client negotiated
+CONVERSATION_ERROR = {
+    "success": False,
+    "error": "Internal server error",
+    "message": "An error occurred processing your request"
+}
+
 class ReviewMode(Enum):
     """Different review modes available"""
     NORMAL = "normal"
@@ -53,12 +256,31 @@ class ReviewMode(Enum):
     FOCUS = "focus"  # No hints, stricter ratings
     PRACTICE = "practice"  # No scheduling updates
 
+REVIEW_MODES = {mode.value: mode for mode in ReviewMode}
+AVAILABLE_MODES = ", ".join(REVIEW_MODES)
+MODE_DESCRIPTIONS = {
+    ReviewMode.NORMAL: "Standard review with full features",
+    ReviewMode.SPEED: "Quick reviews with time pressure",
+    ReviewMode.FOCUS: "Serious mode with no hints and stricter ratings",
+    ReviewMode.PRACTICE: "Practice mode - reviews don't affect scheduling"
+}
+
+def parse_review_mode(value: str) -> Optional[ReviewMode]:
+    """Map a mode name from a request to a ReviewMode, or None if unknown"""
+    return REVIEW_MODES.get(value)
+
 class SessionState(Enum):
     """Review session states"""
     ACTIVE = "active"
     PAUSED = "paused"
     ENDED = "ended"
 
+class IntentArgs(Enum):
+    """Which part of a conversation event an intent handler receives"""
+    NONE = "none"
+    DATA = "data"  # The whole event payload
+    ENTITIES = "entities"  # Only the extracted entities
+
 class VoiceStreamHandler:
     """Handle real-time voice streaming with ElevenLabs WebSocket API"""
     
@@ -70,17 +292,41 @@ class VoiceStreamHandler:
         self.connected = False
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = 5
-        self.connection_lock = asyncio.Lock()
-        self.message_queue = asyncio.Queue()
+        # Created on self.loop by connect(); before Python 3.10 a lock binds
+        # to the loop it is built on
+        self.connection_lock: Optional[asyncio.Lock] = None
         self.response_callbacks = {}
-        self.executor = ThreadPoolExecutor(max_workers=2)
+        
+        # Outbound audio is queued and written by a single task that merges
+        # consecutive chunks, so a burst of small chunks becomes one frame.
+        # The queue is created on self.loop by the first stream_audio call,
+        # since before Python 3.10 a queue binds to the loop it is built on
+        self._outbound: Optional[asyncio.Queue] = None
+        self._writer_task = None
+        self.max_audio_batch = 16
+        
+        # One long-lived event loop owns the WebSocket and every send on it
+        self.loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._loop_thread.start()
+    
+    def run_coroutine(self, coro):
+        """Schedule a coroutine on the handler's event loop from any thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
         
     async def connect(self):
         """Establish WebSocket connection with retry logic"""
         if self.connected and self.ws and not self.ws.closed:
             return True
+        
+        if self.connection_lock is None:
+            self.connection_lock = asyncio.Lock()
             
         async with self.connection_lock:
+            # Another sender may have connected while this one waited
+            if self.connected and self.ws and not self.ws.closed:
+                return True
+            
             try:
                 headers = {
                     "xi-agent-id": self.agent_id,
@@ -92,7 +338,8 @@ class VoiceStreamHandler:
                     self.websocket_url,
                     extra_headers=headers,
                     ping_interval=30,
-                    ping_timeout=10
+                    ping_timeout=10,
+                    compression=None  # Deflate costs CPU and gains nothing on audio
                 )
                 
                 self.connected = True
@@ -120,7 +367,7 @@ class VoiceStreamHandler:
         """Listen for incoming WebSocket messages"""
         try:
             async for message in self.ws:
-                await self._handle_message(json.loads(message))
+                await self._handle_message(loads_json(message))
         except websockets.exceptions.ConnectionClosed:
             logger.warning("WebSocket connection closed")
             self.connected = False
@@ -176,6 +423,45 @@ class VoiceStreamHandler:
             if not await self.connect():
                 raise ConnectionError("Failed to establish WebSocket connection")
         
+        if self._outbound is None:
+            self._outbound = asyncio.Queue()
+        
+        # Resolved by the writer once the batch holding this chunk is sent
+        sent = asyncio.get_running_loop().create_future()
+        self._outbound.put_nowait((format, audio_data, sent))
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.ensure_future(self._audio_writer())
+        await sent
+    
+    async def _audio_writer(self):
+        """Drain queued audio, merging consecutive same-format chunks into one message"""
+        pending = None
+        while True:
+            first = pending or await self._outbound.get()
+            pending = None
+            audio_format = first[0]
+            batch = [first]
+            
+            while not self._outbound.empty() and len(batch) < self.max_audio_batch:
+                item = self._outbound.get_nowait()
+                if item[0] != audio_format:
+                    pending = item
+                    break
+                batch.append(item)
+            
+            try:
+                await self._send_audio_message(audio_format, b''.join(chunk for _, chunk, _ in batch))
+            except Exception as e:
+                for _, _, sent in batch:
+                    if not sent.done():
+                        sent.set_exception(e)
+            else:
+                for _, _, sent in batch:
+                    if not sent.done():
+                        sent.set_result(None)
+    
+    async def _send_audio_message(self, format: str, audio_data: bytes):
+        """Send one audio message over the WebSocket"""
         try:
             message = {
                 "type": "audio",
@@ -184,13 +470,14 @@ class VoiceStreamHandler:
                 "timestamp": int(time.time() * 1000)
             }
             
-            await self.ws.send(json.dumps(message))
+            await self.ws.send(dumps_json(message).decode('utf-8'))
             logger.debug(f"Sent audio chunk: {len(audio_data)} bytes")
             
         except websockets.exceptions.ConnectionClosed:
+            # Fail this batch right away; the message listener sees the same
+            # close and owns reconnection, so queued chunks don't wait on backoff
             logger.warning("Connection closed during audio streaming")
             self.connected = False
-            await self._handle_reconnection()
             raise
         except Exception as e:
             logger.error(f"Audio streaming error: {e}")
@@ -212,7 +499,7 @@ class VoiceStreamHandler:
             if context:
                 message["context"] = context
                 
-            await self.ws.send(json.dumps(message))
+            await self.ws.send(dumps_json(message).decode('utf-8'))
             logger.debug(f"Sent text message: {text[:100]}...")
             
         except Exception as e:
@@ -294,26 +581,27 @@ class VoiceStreamHandler:
     
     def start_streaming_session(self):
         """Start a new streaming session (thread-safe)"""
-        def run_async():
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                loop.run_until_complete(self.connect())
-            except Exception as e:
-                logger.error(f"Streaming session error: {e}")
+        def report(future):
+            if not future.cancelled() and future.exception():
+                logger.error(f"Streaming session error: {future.exception()}")
         
-        self.executor.submit(run_async)
+        # Connect on the persistent loop so the listener task outlives this call
+        self.run_coroutine(self.connect()).add_done_callback(report)
     
     def stop_streaming_session(self):
         """Stop the streaming session"""
-        def run_async():
-            try:
-                loop = asyncio.get_event_loop()
-                loop.run_until_complete(self.disconnect())
-            except Exception as e:
-                logger.error(f"Stop streaming error: {e}")
+        def report(future):
+            if not future.cancelled() and future.exception():
+                logger.error(f"Stop streaming error: {future.exception()}")
         
-        self.executor.submit(run_async)
+        self.run_coroutine(self.disconnect()).add_done_callback(report)
+    
+    def shutdown(self):
+        """Disconnect and stop the handler's event loop"""
+        try:
+            self.run_coroutine(self.disconnect()).result(timeout=5)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
 
 class ElevenLabsIntegration:
     """Enhanced ElevenLabs integration options for different widget types"""
@@ -1041,11 +1329,37 @@ class ReviewSession:
     paused_duration: timedelta = timedelta()
     last_pause_time: Optional[datetime] = None
 
+def search_term(field: str, value: str) -> str:
+    """Quoted Anki search term, so spaces or quotes in value stay literal"""
+    return '"' + field + ':' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+@lru_cache(maxsize=128)
+def deck_name(did: int) -> str:
+    """Deck name for an id; cleared when a review session ends"""
+    return mw.col.decks.name(did)
+
+def _pending_card_stats(get_counts=None) -> Dict[str, Any]:
+    """Due card counts reported when no review session is running"""
+    try:
+        counts = get_counts() if get_counts else mw.col.sched.counts()
+        return {
+            "success": True,
+            "session_active": False,
+            "pending_cards": {
+                "new": counts[0],
+                "learning": counts[1], 
+                "review": counts[2],
+                "total": sum(counts)
+            }
+        }
+    except:
+        return {"success": True, "session_active": False}
+
 class AnkiBridge(QObject):
     """Bridge between web view and Anki for bidirectional communication"""
     
     @pyqtSlot(str, result=str)
-    def process_command(self, command):
+    def process_command(self, command: str) -> str:
         """Handle commands from the web interface"""
         try:
             if command == "start_focus_mode":
@@ -1116,49 +1430,19 @@ class AnkiBridge(QObject):
             return json.dumps({"success": False, "error": str(e)})
     
     @pyqtSlot(result=str)
-    def get_current_stats(self):
+    def get_current_stats(self) -> str:
         """Get current session statistics"""
         try:
-            if voice_server and voice_server.current_session:
-                accuracy = 0
-                if voice_server.current_session.cards_reviewed > 0:
-                    accuracy = round(
-                        voice_server.current_session.correct_count / 
-                        voice_server.current_session.cards_reviewed * 100
-                    )
-                
-                return json.dumps({
-                    "success": True,
-                    "session_active": True,
-                    "cards_reviewed": voice_server.current_session.cards_reviewed,
-                    "streak": voice_server.current_session.streak,
-                    "best_streak": voice_server.current_session.best_streak,
-                    "accuracy": accuracy,
-                    "mode": voice_server.current_session.mode.value,
-                    "state": voice_server.current_session.state.value
-                })
-            else:
-                # Get basic Anki stats even without active session
-                try:
-                    counts = mw.col.sched.counts()
-                    return json.dumps({
-                        "success": True,
-                        "session_active": False,
-                        "pending_cards": {
-                            "new": counts[0],
-                            "learning": counts[1], 
-                            "review": counts[2],
-                            "total": sum(counts)
-                        }
-                    })
-                except:
-                    return json.dumps({"success": True, "session_active": False})
+            if voice_server:
+                return json.dumps(voice_server._get_live_stats())
+            # Get basic Anki stats even without active session
+            return json.dumps(_pending_card_stats())
         except Exception as e:
             logger.error(f"Error getting stats: {str(e)}")
             return json.dumps({"success": False, "error": str(e)})
     
     @pyqtSlot(str, result=str)
-    def get_deck_stats(self, deck_name):
+    def get_deck_stats(self, deck_name: str) -> str:
         """Get statistics for a specific deck"""
         try:
             deck_id = mw.col.decks.id(deck_name)
@@ -1204,7 +1488,7 @@ class VoiceReviewConfig:
     
     def load_config(self):
         """Load configuration from Anki"""
-        config = mw.addonManager.getConfig(__name__) or {}
+        config = mw.addonManager.getConfig(__name__) or EMPTY_CONFIG
         for key, value in config.items():
             if hasattr(self, key):
                 setattr(self, key, value)
@@ -1235,6 +1519,12 @@ class VoiceAssistantWidget(QDockWidget):
         # Initialize widget manager
         self.widget_manager = WidgetManager()
         
+        # Coalesce bursts of refresh requests into a single reload
+        self._reload_timer = QTimer(self)
+        self._reload_timer.setSingleShot(True)
+        self._reload_timer.setInterval(16)
+        self._reload_timer.timeout.connect(self._do_reload)
+        
         # Use enhanced integration based on type
         if widget_type == 'sidebar':
             self._init_as_sidebar()
@@ -1544,7 +1834,13 @@ class VoiceAssistantWidget(QDockWidget):
             self.widget_type = new_type
     
     def refresh_widget(self):
-        """Refresh the widget content"""
+        """Refresh the widget content (debounced)"""
+        # start() on a pending single-shot timer just restarts it, so repeated
+        # calls within one frame collapse into one reload
+        self._reload_timer.start()
+    
+    def _do_reload(self):
+        """Reload the web view once the refresh burst has settled"""
         if hasattr(self, 'web_view'):
             self.web_view.reload()
     
@@ -1564,6 +1860,14 @@ class VoiceAssistantWidget(QDockWidget):
         if hasattr(self, 'widget_manager'):
             self.widget_manager.toggle_widget(self.widget_type)
 
+def rich_text_label(html: str) -> QLabel:
+    """Static rich-text panel; a QLabel skips QTextBrowser's navigation and editing machinery"""
+    label = QLabel()
+    label.setTextFormat(Qt.TextFormat.RichText)
+    label.setWordWrap(True)
+    label.setText(html)
+    return label
+
 class VoiceAssistantDialog(QDialog):
     """Floating voice assistant window"""
     
@@ -1681,9 +1985,7 @@ class VoiceAssistantDialog(QDialog):
         layout.addWidget(self.web_view)
         
         # Tips section
-        tips = QTextBrowser()
-        tips.setMaximumHeight(100)
-        tips.setHtml("""
+        tips = rich_text_label("""
         <html>
         <body style="font-family: Arial; font-size: 12px;">
         <b>Voice Commands:</b><br>
@@ -1695,6 +1997,7 @@ class VoiceAssistantDialog(QDialog):
         </body>
         </html>
         """)
+        tips.setMaximumHeight(100)
         layout.addWidget(tips)
         
         self.setLayout(layout)
@@ -1713,211 +2016,39 @@ class VoiceAssistantDialog(QDialog):
         open_config_dialog()
 
 class RateLimiter:
-    """Simple rate limiter for webhook requests"""
+    """Token-bucket rate limiter for webhook requests"""
+    
+    BUCKET_COUNT = 4096  # Power of two so a hashed IP can be masked to a slot
     
     def __init__(self, max_requests_per_minute=100):
         self.max_requests = max_requests_per_minute
-        self.requests = {}  # IP -> list of timestamps
-        self.cleanup_interval = 60  # seconds
-        self.last_cleanup = datetime.now()
+        self.refill_per_ns = max_requests_per_minute / 60e9
+        # (tokens, last_refill_ns) per slot; IPs hash into a fixed table, so
+        # memory stays bounded however many clients show up
+        self._buckets = [(float(max_requests_per_minute), 0)] * self.BUCKET_COUNT
+        self._lock = threading.Lock()
     
     def is_allowed(self, client_ip: str) -> bool:
         """Check if request from client_ip is allowed"""
-        now = datetime.now()
-        
-        # Cleanup old entries periodically
-        if (now - self.last_cleanup).total_seconds() > self.cleanup_interval:
-            self._cleanup_old_requests(now)
-            self.last_cleanup = now
-        
-        # Get or create request history for this IP
-        if client_ip not in self.requests:
-            self.requests[client_ip] = []
+        slot = hash(client_ip) & (self.BUCKET_COUNT - 1)
+        now = time.monotonic_ns()
         
-        # Remove requests older than 1 minute
-        one_minute_ago = now - timedelta(minutes=1)
-        self.requests[client_ip] = [
-            timestamp for timestamp in self.requests[client_ip] 
-            if timestamp > one_minute_ago
-        ]
+        with self._lock:
+            tokens, last_refill = self._buckets[slot]
+            tokens = min(self.max_requests, tokens + (now - last_refill) * self.refill_per_ns)
+            allowed = tokens >= 1
+            self._buckets[slot] = (tokens - 1 if allowed else tokens, now)
         
-        # Check if under limit
-        if len(self.requests[client_ip]) >= self.max_requests:
+        if not allowed:
             logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            return False
-        
-        # Add current request
-        self.requests[client_ip].append(now)
-        return True
-    
-    def _cleanup_old_requests(self, now: datetime):
-        """Remove old request histories to prevent memory buildup"""
-        cutoff = now - timedelta(minutes=5)  # Keep last 5 minutes
-        for ip in list(self.requests.keys()):
-            self.requests[ip] = [
-                timestamp for timestamp in self.requests[ip] 
-                if timestamp > cutoff
-            ]
-            # Remove empty entries
-            if not self.requests[ip]:
-                del self.requests[ip]
+        return allowed
 
-class AnkiVoiceReviewServer:
-    def __init__(self):
-        self.app = Flask(__name__)
-        CORS(self.app)  # Enable CORS for webhook access
-        self.config = VoiceReviewConfig()
-        
-        # State management
-        self.current_card = None
-        self.is_showing_answer = False
-        self.current_session: Optional[ReviewSession] = None
-        self.review_history: List[Dict] = []
-        
-        # Utilities
-        self.h2t = html2text.HTML2Text()
-        self.h2t.ignore_images = True
-        self.h2t.ignore_links = True
-        self.h2t.body_width = 0  # Don't wrap text
-        
-        # Rate limiting and security
-        max_requests = getattr(self.config, 'max_requests_per_minute', 100)
-        self.rate_limiter = RateLimiter(max_requests_per_minute=max_requests)
-        
-        # Voice streaming handler
-        api_key = os.getenv("ELEVENLABS_API_KEY", "")
-        if api_key:
-            self.voice_stream_handler = VoiceStreamHandler(ELEVENLABS_AGENT_ID, api_key)
-        else:
-            self.voice_stream_handler = None
-            logger.warning("ELEVENLABS_API_KEY not found, WebSocket streaming disabled")
-        
-        # Database for session history
-        self.init_database()
-        self.setup_routes()
-        self.setup_error_handlers()
-    
-    def init_database(self):
-        """Initialize SQLite database for session tracking"""
-        db_path = os.path.join(mw.addonManager.addonsFolder(__name__), 'sessions.db')
-        self.db = sqlite3.connect(db_path, check_same_thread=False)
-        self.db.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                id TEXT PRIMARY KEY,
-                start_time TIMESTAMP,
-                end_time TIMESTAMP,
-                mode TEXT,
-                cards_reviewed INTEGER,
-                correct_count INTEGER,
-                best_streak INTEGER,
-                total_duration_seconds INTEGER
-            )
-        ''')
-        self.db.execute('''
-            CREATE TABLE IF NOT EXISTS review_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT,
-                card_id INTEGER,
-                question TEXT,
-                answer TEXT,
-                user_rating TEXT,
-                review_time TIMESTAMP,
-                time_to_answer_seconds REAL,
-                hints_used INTEGER,
-                FOREIGN KEY (session_id) REFERENCES sessions(id)
-            )
-        ''')
-        self.db.commit()
-    
-    def setup_error_handlers(self):
-        """Setup Flask error handlers"""
-        @self.app.errorhandler(404)
-        def not_found(e):
-            return jsonify({"success": False, "error": "Endpoint not found"}), 404
-        
-        @self.app.errorhandler(500)
-        def internal_error(e):
-            logger.error(f"Internal server error: {str(e)}")
-            return jsonify({"success": False, "error": "Internal server error"}), 500
-    
-    def verify_webhook_signature(self, signature: str, payload: bytes) -> bool:
-        """Verify ElevenLabs webhook signature"""
-        if not self.config.webhook_secret or not self.config.enable_webhook_auth:
-            return True  # Skip verification if not configured
-        
-        try:
-            expected_signature = hmac.new(
-                self.config.webhook_secret.encode(),
-                payload,
-                hashlib.sha256
-            ).hexdigest()
-            
-            # Remove 'sha256=' prefix if present
-            if signature.startswith('sha256='):
-                signature = signature[7:]
-            
-            return hmac.compare_digest(signature, expected_signature)
-        except Exception as e:
-            logger.error(f"Error verifying webhook signature: {str(e)}")
-            return False
-    
-    def create_pwa_manifest(self):
-        """Create a PWA manifest for mobile access"""
-        return {
-            "name": "Anki Voice Study Buddy",
-            "short_name": "Anki Voice",
-            "description": "Review Anki cards hands-free with AI",
-            "start_url": "/mobile",
-            "display": "standalone",
-            "orientation": "portrait",
-            "background_color": "#f5f5f5",
-            "theme_color": "#007bff",
-            "scope": "/",
-            "lang": "en",
-            "icons": [
-                {
-                    "src": "/static/icon-192.png",
-                    "sizes": "192x192",
-                    "type": "image/png",
-                    "purpose": "any maskable"
-                },
-                {
-                    "src": "/static/icon-512.png", 
-                    "sizes": "512x512",
-                    "type": "image/png",
-                    "purpose": "any maskable"
-                }
-            ],
-            "screenshots": [
-                {
-                    "src": "/static/screenshot-mobile.png",
-                    "sizes": "390x844",
-                    "type": "image/png",
-                    "form_factor": "narrow"
-                }
-            ],
-            "categories": ["education", "productivity"],
-            "shortcuts": [
-                {
-                    "name": "Start Review",
-                    "short_name": "Review",
-                    "description": "Start a new review session",
-                    "url": "/mobile?action=start",
-                    "icons": [{"src": "/static/icon-192.png", "sizes": "192x192"}]
-                },
-                {
-                    "name": "Statistics",
-                    "short_name": "Stats",
-                    "description": "View your study statistics",
-                    "url": "/mobile?action=stats",
-                    "icons": [{"src": "/static/icon-192.png", "sizes": "192x192"}]
-                }
-            ]
-        }
-    
-    def create_mobile_interface_html(self):
-        """Create mobile-optimized HTML interface"""
-        return """
+def content_etag(body: bytes) -> str:
+    """Strong ETag derived from a response body"""
+    return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+# Static pages are encoded once at import and served as-is
+MOBILE_HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -2322,7 +2453,7 @@ class AnkiVoiceReviewServer:
         function initializeApp() {
             checkServerStatus();
             updateStats();
-            setInterval(updateStats, 5000);
+            subscribeToStats();
             
             // Check URL parameters for actions
             const urlParams = new URLSearchParams(window.location.search);
@@ -2368,6 +2499,22 @@ class AnkiVoiceReviewServer:
             }
         }
         
+        function subscribeToStats() {
+            // Server pushes a snapshot whenever session stats change
+            if (typeof EventSource === 'undefined') {
+                setInterval(updateStats, 5000);
+                return;
+            }
+            const source = new EventSource('/events/stats');
+            source.onmessage = (event) => {
+                try {
+                    applyStats(JSON.parse(event.data));
+                } catch (error) {
+                    console.error('Failed to apply stats event:', error);
+                }
+            };
+        }
+        
         async function updateStats() {
             try {
                 let stats;
@@ -2381,28 +2528,32 @@ class AnkiVoiceReviewServer:
                     return;
                 }
                 
-                if (stats.success) {
-                    if (stats.session_active) {
-                        document.getElementById('cardsReviewed').textContent = stats.cards_reviewed;
-                        document.getElementById('currentStreak').textContent = stats.streak;
-                        document.getElementById('accuracy').textContent = stats.accuracy + '%';
-                        document.getElementById('pending').textContent = '-';
-                        isSessionActive = true;
-                        updateButtonStates();
-                    } else if (stats.pending_cards) {
-                        document.getElementById('cardsReviewed').textContent = '-';
-                        document.getElementById('currentStreak').textContent = '-';
-                        document.getElementById('accuracy').textContent = '-';
-                        document.getElementById('pending').textContent = stats.pending_cards.total;
-                        isSessionActive = false;
-                        updateButtonStates();
-                    }
-                }
+                applyStats(stats);
             } catch (error) {
                 console.error('Failed to update stats:', error);
             }
         }
         
+        function applyStats(stats) {
+            if (stats.success) {
+                if (stats.session_active) {
+                    document.getElementById('cardsReviewed').textContent = stats.cards_reviewed;
+                    document.getElementById('currentStreak').textContent = stats.streak;
+                    document.getElementById('accuracy').textContent = stats.accuracy + '%';
+                    document.getElementById('pending').textContent = '-';
+                    isSessionActive = true;
+                    updateButtonStates();
+                } else if (stats.pending_cards) {
+                    document.getElementById('cardsReviewed').textContent = '-';
+                    document.getElementById('currentStreak').textContent = '-';
+                    document.getElementById('accuracy').textContent = '-';
+                    document.getElementById('pending').textContent = stats.pending_cards.total;
+                    isSessionActive = false;
+                    updateButtonStates();
+                }
+            }
+        }
+        
         function updateButtonStates() {
             const startBtn = document.getElementById('startBtn');
             if (isSessionActive) {
@@ -2526,206 +2677,16 @@ class AnkiVoiceReviewServer:
 </body>
 </html>
         """
-    
-    def setup_routes(self):
-        """Define all webhook endpoints"""
-        
-        @self.app.before_request
-        def verify_webhook():
-            """Verify webhook requests and apply rate limiting"""
-            # In production, verify webhook signatures
-            if request.method == 'POST':
-                # Log request for debugging
-                logger.debug(f"Webhook received: {request.path}")
-                logger.debug(f"Headers: {dict(request.headers)}")
-                logger.debug(f"Body: {request.get_data(as_text=True)}")
-                
-                # Verify ElevenLabs webhook signature (if configured)
-                signature = request.headers.get('X-ElevenLabs-Signature')
-                if signature and self.config.enable_webhook_auth:
-                    payload = request.get_data()
-                    if not self.verify_webhook_signature(signature, payload):
-                        logger.warning(f"Invalid webhook signature from {request.remote_addr}")
-                        return jsonify({"error": "Invalid webhook signature"}), 401
-            
-            # Apply rate limiting to all requests
-            client_ip = request.remote_addr or 'unknown'
-            if not self.rate_limiter.is_allowed(client_ip):
-                logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-                return jsonify({"error": "Rate limit exceeded"}), 429
-            
-            # Log all requests (keeping original functionality)
-            logger.debug(f"Request: {request.method} {request.path} from {client_ip}")
-            if request.json:
-                logger.debug(f"Payload: {request.json}")
-            elif request.method == 'POST' and request.data:
-                logger.debug(f"Raw data: {request.get_data(as_text=True)[:200]}...")  # Limit log size
-        
-        @self.app.route('/health', methods=['GET'])
-        def health_check():
-            """Health check endpoint"""
-            return jsonify({
-                "success": True,
-                "status": "healthy",
-                "session_active": self.current_session is not None,
-                "anki_connected": mw.col is not None
-            })
-        
-        @self.app.route('/webhook/conversation_event', methods=['POST'])
-        def handle_conversation_event():
-            """Handle conversation events from ElevenLabs"""
-            try:
-                data = request.json or {}
-                event_type = data.get('event_type')
-                
-                logger.info(f"Conversation event: {event_type}")
-                
-                if event_type == 'session_started':
-                    # Initialize session when conversation starts
-                    return self._handle_start_session(data)
-                
-                elif event_type == 'user_intent':
-                    intent = data.get('intent', '').lower()
-                    entities = data.get('entities', {})
-                    user_message = data.get('user_message', '')
-                    
-                    logger.debug(f"User intent: {intent}, entities: {entities}")
-                    
-                    # Route based on detected intent
-                    intent_handlers = {
-                        'start_review': lambda: self._handle_start_session(data),
-                        'start_session': lambda: self._handle_start_session(data),
-                        'next_card': lambda: self._handle_next_card(),
-                        'show_answer': lambda: self._handle_show_answer(),
-                        'rate_card': lambda: self._handle_answer_card(entities),
-                        'answer_card': lambda: self._handle_answer_card(entities),
-                        'get_hint': lambda: self._handle_get_hint(),
-                        'pause': lambda: self._handle_pause_session(),
-                        'resume': lambda: self._handle_resume_session(),
-                        'statistics': lambda: self._handle_get_statistics(data),
-                        'end_session': lambda: self._handle_end_session(),
-                        'explain': lambda: self._handle_explain_concept(),
-                        'related_cards': lambda: self._handle_get_related_cards()
-                    }
-                    
-                    # Try exact intent match first
-                    handler = intent_handlers.get(intent)
-                    if handler:
-                        return handler()
-                    
-                    # Fallback: intent detection from user message
-                    return self._detect_intent_from_message(user_message, entities)
-                
-                elif event_type == 'session_ended':
-                    return self._handle_end_session()
-                
-                elif event_type == 'user_speech':
-                    # Handle direct speech recognition results
-                    transcript = data.get('transcript', '').lower()
-                    confidence = data.get('confidence', 0.0)
-                    
-                    if confidence > 0.7:  # High confidence threshold
-                        return self._process_speech_command(transcript)
-                    else:
-                        return jsonify({
-                            "success": False,
-                            "message": "Could not understand speech clearly. Please try again.",
-                            "confidence": confidence
-                        })
-                
-                else:
-                    logger.warning(f"Unknown event type: {event_type}")
-                    return jsonify({
-                        "success": False,
-                        "message": f"Unknown event type: {event_type}"
-                    })
-                    
-            except Exception as e:
-                logger.error(f"Conversation webhook error: {str(e)}")
-                return jsonify({
-                    "success": False,
-                    "error": "Internal server error",
-                    "message": "An error occurred processing your request"
-                }), 500
-        
-        @self.app.route('/webhook/audio_stream', methods=['POST'])
-        def handle_audio_stream():
-            """Handle real-time audio streaming for immediate feedback"""
-            try:
-                data = request.json or {}
-                stream_type = data.get('stream_type')
-                
-                if stream_type == 'partial_transcript':
-                    # Handle partial speech recognition
-                    partial_text = data.get('text', '').lower()
-                    
-                    # Provide immediate feedback for common commands
-                    quick_responses = {
-                        'next': "Getting next card...",
-                        'answer': "Showing answer...",
-                        'hint': "Generating hint...",
-                        'again': "Marked as 'again'",
-                        'good': "Marked as 'good'",
-                        'easy': "Marked as 'easy'",
-                        'hard': "Marked as 'hard'"
-                    }
-                    
-                    for command, response in quick_responses.items():
-                        if command in partial_text:
-                            return jsonify({
-                                "success": True,
-                                "immediate_feedback": response,
-                                "recognized_command": command
-                            })
-                
-                elif stream_type == 'audio_chunk':
-                    # Handle audio processing (for future enhancement)
-                    return jsonify({
-                        "success": True,
-                        "message": "Audio chunk received"
-                    })
-                
-                return jsonify({"success": True})
-                
-            except Exception as e:
-                logger.error(f"Audio stream error: {str(e)}")
-                return jsonify({"error": "Stream processing error"}), 500
-        
-        @self.app.route('/manifest.json', methods=['GET'])
-        def serve_manifest():
-            """Serve PWA manifest for mobile installation"""
-            manifest = self.create_pwa_manifest()
-            response = jsonify(manifest)
-            response.headers['Content-Type'] = 'application/manifest+json'
-            response.headers['Cache-Control'] = 'public, max-age=3600'  # Cache for 1 hour
-            return response
-        
-        @self.app.route('/mobile', methods=['GET'])
-        def mobile_interface():
-            """Serve mobile-optimized interface"""
-            try:
-                html_content = self.create_mobile_interface_html()
-                # Replace template variable with actual agent ID
-                html_content = html_content.replace('{{ agent_id }}', ELEVENLABS_AGENT_ID)
-                
-                # Add headers for PWA
-                response = self.app.response_class(
-                    response=html_content,
-                    status=200,
-                    mimetype='text/html'
-                )
-                response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-                response.headers['Pragma'] = 'no-cache'
-                response.headers['Expires'] = '0'
-                return response
-            except Exception as e:
-                logger.error(f"Error serving mobile interface: {str(e)}")
-                return jsonify({"error": "Failed to load mobile interface"}), 500
-        
-        @self.app.route('/offline.html', methods=['GET'])
-        def offline_page():
-            """Serve offline page for PWA"""
-            offline_html = """
+MOBILE_HTML_PREFIX, MOBILE_HTML_SUFFIX = (
+    part.encode('utf-8') for part in MOBILE_HTML_TEMPLATE.split('{{ agent_id }}', 1)
+)
+
+@lru_cache(maxsize=None)
+def render_mobile_html(agent_id: str) -> bytes:
+    """Fill the agent id into the mobile page, once per agent"""
+    return b''.join((MOBILE_HTML_PREFIX, agent_id.encode('utf-8'), MOBILE_HTML_SUFFIX))
+
+OFFLINE_HTML = """
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -2795,1066 +2756,1248 @@ class AnkiVoiceReviewServer:
     </div>
 </body>
 </html>
-            """
-            return self.app.response_class(
-                response=offline_html,
-                status=200,
-                mimetype='text/html'
-            )
+            """.encode('utf-8')
+OFFLINE_HTML_ETAG = content_etag(OFFLINE_HTML)
+
+REVIEW_LOG_INSERT = '''
+    INSERT INTO review_log
+    (session_id, card_id, question, answer, user_rating, review_time, time_to_answer_seconds, hints_used)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Statistics for a period: review_log aggregates, then sessions aggregates
+PERIOD_STATISTICS_SQL = '''
+    SELECT r.total, r.correct, r.avg_time, r.hints, s.total, s.max_streak
+    FROM (
+        SELECT COUNT(*) AS total,
+               SUM(CASE WHEN user_rating NOT IN ('again', 'repeat', 'forgot') THEN 1 ELSE 0 END) AS correct,
+               AVG(time_to_answer_seconds) AS avg_time,
+               SUM(hints_used) AS hints
+        FROM review_log
+        WHERE review_time >= ?
+    ) AS r, (
+        SELECT COUNT(*) AS total, MAX(best_streak) AS max_streak
+        FROM sessions
+        WHERE start_time >= ?
+    ) AS s
+'''
+
+class AnkiVoiceReviewServer:
+    def __init__(self):
+        self.app = Flask(__name__)
+        CORS(self.app)  # Enable CORS for webhook access
+        self.sock = Sock(self.app) if Sock else None
+        if OrjsonProvider:
+            self.app.json = OrjsonProvider(self.app)
+        self.config = VoiceReviewConfig()
         
-        @self.app.route('/pwa-info', methods=['GET'])
-        def pwa_info():
-            """Provide PWA installation info and status"""
-            return jsonify({
-                "name": "Anki Voice Study Buddy",
-                "installable": True,
-                "features": [
-                    "Offline access to interface",
-                    "Native app-like experience",
-                    "Home screen installation",
-                    "Background sync capabilities",
-                    "Push notifications (future)"
-                ],
-                "requirements": [
-                    "HTTPS connection (or localhost)",
-                    "Web app manifest",
-                    "Service worker",
-                    "Installability criteria met"
-                ],
-                "shortcuts": [
-                    {"name": "Start Review", "url": "/mobile?action=start"},
-                    {"name": "Statistics", "url": "/mobile?action=stats"}
-                ]
-            })
+        # State management
+        self.current_card = None
+        self._card_cache: Dict[str, Any] = {}  # Derived text/metadata for current_card
+        self._counts_cache: Optional[Tuple[int, int, int]] = None  # Scheduler counts; reset when a card is answered
+        self.is_showing_answer = False
+        self.current_session: Optional[ReviewSession] = None
+        self.review_history: List[Dict] = []
         
-        # Voice Streaming WebSocket Endpoints
-        @self.app.route('/stream/start', methods=['POST'])
-        def start_voice_stream():
-            """Start WebSocket voice streaming session"""
-            try:
-                if not self.voice_stream_handler:
-                    return jsonify({
-                        "success": False,
-                        "error": "Voice streaming not available - ELEVENLABS_API_KEY not configured"
-                    }), 400
-                
-                # Start streaming session in background
-                self.voice_stream_handler.start_streaming_session()
-                
-                return jsonify({
-                    "success": True,
-                    "message": "Voice streaming session started",
-                    "websocket_url": self.voice_stream_handler.websocket_url,
-                    "agent_id": self.voice_stream_handler.agent_id
-                })
-                
-            except Exception as e:
-                logger.error(f"Start voice stream error: {e}")
-                return jsonify({
-                    "success": False,
-                    "error": str(e)
-                }), 500
+        # Bumped whenever session stats change; /events/stats streams wait on it
+        self._stats_changed = threading.Condition()
+        self._stats_version = 0
+        self._stopping = False  # Set by stop() so open streams return
         
-        @self.app.route('/stream/stop', methods=['POST'])
-        def stop_voice_stream():
-            """Stop WebSocket voice streaming session"""
-            try:
-                if not self.voice_stream_handler:
-                    return jsonify({
-                        "success": False,
-                        "error": "Voice streaming not available"
-                    }), 400
-                
-                self.voice_stream_handler.stop_streaming_session()
-                
-                return jsonify({
-                    "success": True,
-                    "message": "Voice streaming session stopped"
-                })
-                
-            except Exception as e:
-                logger.error(f"Stop voice stream error: {e}")
-                return jsonify({
-                    "success": False,
-                    "error": str(e)
-                }), 500
+        # Utilities
+        self.h2t = html2text.HTML2Text()
+        self.h2t.ignore_images = True
+        self.h2t.ignore_links = True
+        self.h2t.body_width = 0  # Don't wrap text
+        # Card fields are re-cleaned for hints, explanations and related cards
+        self.clean_html = lru_cache(maxsize=2048)(self._clean_html)
         
-        @self.app.route('/stream/status', methods=['GET'])
-        def stream_status():
-            """Get voice streaming status"""
-            try:
-                if not self.voice_stream_handler:
-                    return jsonify({
-                        "success": True,
-                        "available": False,
-                        "connected": False,
-                        "reason": "ELEVENLABS_API_KEY not configured"
-                    })
-                
-                return jsonify({
-                    "success": True,
-                    "available": True,
-                    "connected": self.voice_stream_handler.connected,
-                    "reconnect_attempts": self.voice_stream_handler.reconnect_attempts,
-                    "max_reconnect_attempts": self.voice_stream_handler.max_reconnect_attempts,
-                    "websocket_url": self.voice_stream_handler.websocket_url
-                })
-                
-            except Exception as e:
-                logger.error(f"Stream status error: {e}")
-                return jsonify({
-                    "success": False,
-                    "error": str(e)
-                }), 500
+        # Rate limiting and security
+        max_requests = getattr(self.config, 'max_requests_per_minute', 100)
+        self.rate_limiter = RateLimiter(max_requests_per_minute=max_requests)
         
-        @self.app.route('/stream/send_audio', methods=['POST'])
-        def send_audio_stream():
-            """Send audio data via WebSocket streaming"""
-            try:
-                if not self.voice_stream_handler:
-                    return jsonify({
-                        "success": False,
-                        "error": "Voice streaming not available"
-                    }), 400
-                
-                # Get audio data from request
-                audio_data = request.data
-                if not audio_data:
-                    return jsonify({
-                        "success": False,
-                        "error": "No audio data provided"
-                    }), 400
-                
-                # Get audio format from headers
-                audio_format = request.headers.get('X-Audio-Format', 'pcm')
-                
-                # Send audio asynchronously
-                async def send_audio():
-                    try:
-                        await self.voice_stream_handler.stream_audio(audio_data, audio_format)
-                        return True
-                    except Exception as e:
-                        logger.error(f"Audio streaming error: {e}")
-                        return False
-                
-                # Run in thread pool to avoid blocking
-                result = self.voice_stream_handler.executor.submit(
-                    lambda: asyncio.run(send_audio())
-                ).result(timeout=5)
-                
-                if result:
-                    return jsonify({
-                        "success": True,
-                        "message": "Audio sent successfully",
-                        "bytes_sent": len(audio_data)
-                    })
-                else:
-                    return jsonify({
-                        "success": False,
-                        "error": "Failed to send audio"
-                    }), 500
-                
-            except Exception as e:
-                logger.error(f"Send audio stream error: {e}")
-                return jsonify({
-                    "success": False,
-                    "error": str(e)
-                }), 500
+        # Voice streaming handler
+        api_key = os.getenv("ELEVENLABS_API_KEY", "")
+        if api_key:
+            self.voice_stream_handler = VoiceStreamHandler(ELEVENLABS_AGENT_ID, api_key)
+        else:
+            self.voice_stream_handler = None
+            logger.warning("ELEVENLABS_API_KEY not found, WebSocket streaming disabled")
         
-        @self.app.route('/stream/send_text', methods=['POST'])
-        def send_text_stream():
-            """Send text message via WebSocket streaming"""
-            try:
-                if not self.voice_stream_handler:
-                    return jsonify({
-                        "success": False,
-                        "error": "Voice streaming not available"
-                    }), 400
-                
-                data = request.json or {}
-                text = data.get('text', '')
-                context = data.get('context', {})
-                
-                if not text:
-                    return jsonify({
-                        "success": False,
-                        "error": "No text provided"
-                    }), 400
-                
-                # Send text asynchronously
-                async def send_text():
-                    try:
-                        await self.voice_stream_handler.send_text(text, context)
-                        return True
-                    except Exception as e:
-                        logger.error(f"Text streaming error: {e}")
-                        return False
-                
-                # Run in thread pool
-                result = self.voice_stream_handler.executor.submit(
-                    lambda: asyncio.run(send_text())
-                ).result(timeout=5)
-                
-                if result:
-                    return jsonify({
-                        "success": True,
-                        "message": "Text sent successfully",
-                        "text_length": len(text)
-                    })
-                else:
-                    return jsonify({
-                        "success": False,
-                        "error": "Failed to send text"
-                    }), 500
-                
-            except Exception as e:
-                logger.error(f"Send text stream error: {e}")
-                return jsonify({
-                    "success": False,
-                    "error": str(e)
-                }), 500
+        # Intent -> (bound handler, argument kind), built once per server
+        self._intent_handlers = self._build_intent_handlers()
         
-        @self.app.route('/start_session', methods=['POST'])
-        def start_session():
-            """Start a new review session"""
+        # Database for session history
+        self.init_database()
+        
+        # Review rows are written off the request path by a single worker
+        self._db_lock = threading.Lock()
+        self._log_queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._log_thread = threading.Thread(target=self._log_worker, daemon=True)
+        self._log_thread.start()
+        self.setup_routes()
+        self.setup_error_handlers()
+    
+    def init_database(self):
+        """Initialize SQLite database for session tracking"""
+        db_path = os.path.join(mw.addonManager.addonsFolder(__name__), 'sessions.db')
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        # WAL keeps log commits from fsyncing the whole database each time
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                start_time TIMESTAMP,
+                end_time TIMESTAMP,
+                mode TEXT,
+                cards_reviewed INTEGER,
+                correct_count INTEGER,
+                best_streak INTEGER,
+                total_duration_seconds INTEGER
+            )
+        ''')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS review_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT,
+                card_id INTEGER,
+                question TEXT,
+                answer TEXT,
+                user_rating TEXT,
+                review_time TIMESTAMP,
+                time_to_answer_seconds REAL,
+                hints_used INTEGER,
+                FOREIGN KEY (session_id) REFERENCES sessions(id)
+            )
+        ''')
+        # Statistics filter both tables by time period
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_sessions_start_time ON sessions(start_time)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_review_log_review_time ON review_log(review_time)')
+        self.db.commit()
+    
+    def setup_error_handlers(self):
+        """Setup Flask error handlers"""
+        @self.app.errorhandler(404)
+        def not_found(e):
+            return json_body_response(NOT_FOUND_BODY, 404)
+        
+        @self.app.errorhandler(500)
+        def internal_error(e):
+            logger.error(f"Internal server error: {str(e)}")
+            return json_body_response(INTERNAL_ERROR_BODY, 500)
+    
+    def verify_webhook_signature(self, signature: str, payload: bytes) -> bool:
+        """Verify ElevenLabs webhook signature"""
+        if not self.config.webhook_secret or not self.config.enable_webhook_auth:
+            return True  # Skip verification if not configured
+        
+        try:
+            expected_signature = hmac.new(
+                self.config.webhook_secret.encode(),
+                payload,
+                hashlib.sha256
+            ).hexdigest()
+            
+            # Remove 'sha256=' prefix if present
+            if signature.startswith('sha256='):
+                signature = signature[7:]
+            
+            return hmac.compare_digest(signature, expected_signature)
+        except Exception as e:
+            logger.error(f"Error verifying webhook signature: {str(e)}")
+            return False
+    
+    def create_pwa_info(self):
+        """Describe PWA installability for the /pwa-info endpoint"""
+        return {
+            "name": "Anki Voice Study Buddy",
+            "installable": True,
+            "features": [
+                "Offline access to interface",
+                "Native app-like experience",
+                "Home screen installation",
+                "Background sync capabilities",
+                "Push notifications (future)"
+            ],
+            "requirements": [
+                "HTTPS connection (or localhost)",
+                "Web app manifest",
+                "Service worker",
+                "Installability criteria met"
+            ],
+            "shortcuts": [
+                {"name": "Start Review", "url": "/mobile?action=start"},
+                {"name": "Statistics", "url": "/mobile?action=stats"}
+            ]
+        }
+    
+    def create_pwa_manifest(self):
+        """Create a PWA manifest for mobile access"""
+        return {
+            "name": "Anki Voice Study Buddy",
+            "short_name": "Anki Voice",
+            "description": "Review Anki cards hands-free with AI",
+            "start_url": "/mobile",
+            "display": "standalone",
+            "orientation": "portrait",
+            "background_color": "#f5f5f5",
+            "theme_color": "#007bff",
+            "scope": "/",
+            "lang": "en",
+            "icons": [
+                {
+                    "src": "/static/icon-192.png",
+                    "sizes": "192x192",
+                    "type": "image/png",
+                    "purpose": "any maskable"
+                },
+                {
+                    "src": "/static/icon-512.png", 
+                    "sizes": "512x512",
+                    "type": "image/png",
+                    "purpose": "any maskable"
+                }
+            ],
+            "screenshots": [
+                {
+                    "src": "/static/screenshot-mobile.png",
+                    "sizes": "390x844",
+                    "type": "image/png",
+                    "form_factor": "narrow"
+                }
+            ],
+            "categories": ["education", "productivity"],
+            "shortcuts": [
+                {
+                    "name": "Start Review",
+                    "short_name": "Review",
+                    "description": "Start a new review session",
+                    "url": "/mobile?action=start",
+                    "icons": [{"src": "/static/icon-192.png", "sizes": "192x192"}]
+                },
+                {
+                    "name": "Statistics",
+                    "short_name": "Stats",
+                    "description": "View your study statistics",
+                    "url": "/mobile?action=stats",
+                    "icons": [{"src": "/static/icon-192.png", "sizes": "192x192"}]
+                }
+            ]
+        }
+    
+    def create_mobile_interface_html(self):
+        """Create mobile-optimized HTML interface"""
+        return MOBILE_HTML_TEMPLATE
+    
+    def setup_routes(self):
+        """Define all webhook endpoints"""
+        
+        # These never change while the server runs, so render and encode them once
+        self._mobile_html_bytes = render_mobile_html(ELEVENLABS_AGENT_ID)
+        self._mobile_html_etag = content_etag(self._mobile_html_bytes)
+        self._manifest_bytes = dumps_json(self.create_pwa_manifest())
+        self._manifest_etag = content_etag(self._manifest_bytes)
+        self._pwa_info_bytes = dumps_json(self.create_pwa_info())
+        
+        @self.app.before_request
+        def verify_webhook():
+            """Verify webhook requests and apply rate limiting"""
+            # Audio uploads are raw bytes: never decode or JSON-parse them here
+            is_binary = (request.path == '/stream/send_audio'
+                         or request.mimetype == 'application/octet-stream')
+            
+            # In production, verify webhook signatures
+            if request.method == 'POST':
+                # Verify ElevenLabs webhook signature (if configured)
+                signature = request.headers.get('X-ElevenLabs-Signature')
+                if signature and self.config.enable_webhook_auth:
+                    # get_data() caches the body, so handlers don't read it twice
+                    payload = request.get_data()
+                    if not self.verify_webhook_signature(signature, payload):
+                        logger.warning(f"Invalid webhook signature from {request.remote_addr}")
+                        return json_body_response(INVALID_SIGNATURE_BODY, 401)
+            
+            # Apply rate limiting to all requests
+            client_ip = request.remote_addr or 'unknown'
+            if not self.rate_limiter.is_allowed(client_ip):
+                logger.warning(f"Rate limit exceeded for IP: {client_ip}")
+                return json_body_response(RATE_LIMITED_BODY, 429)
+            
+            # Log all requests; nothing below is evaluated unless DEBUG is on,
+            # and arguments are only formatted if a handler emits the record
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Request: %s %s from %s", request.method, request.path, client_ip)
+                if request.method == 'POST':
+                    logger.debug("Headers: %s", request.headers)
+                # silent=True returns None for non-JSON bodies instead of aborting
+                # with 415, and the parsed result is cached for the handler
+                payload = None if is_binary else request.get_json(silent=True)
+                if payload:
+                    logger.debug("Payload: %s", payload)
+                elif request.method == 'POST' and is_binary:
+                    logger.debug("Raw data: %s bytes", request.content_length)
+                elif request.method == 'POST' and request.data:
+                    logger.debug("Raw data: %.200s...", request.get_data(as_text=True))  # Limit log size
+        
+        @self.app.route('/health', methods=['GET'])
+        def health_check():
+            """Health check endpoint"""
+            session_active = self.current_session is not None
+            anki_connected = mw.col is not None
+            
+            # The body only varies with these two flags, so they make a cheap
+            # validator; polling clients get a bodiless 304 while nothing changed
+            etag = f'W/"health-{int(session_active)}{int(anki_connected)}"'
+            if request.headers.get('If-None-Match') == etag:
+                return '', 304
+            
+            response = json_body_response(dumps_json({
+                "success": True,
+                "status": "healthy",
+                "session_active": session_active,
+                "anki_connected": anki_connected
+            }))
+            response.headers['ETag'] = etag
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        
+        @self.app.route('/events/stats', methods=['GET'])
+        def stats_events():
+            """Push session statistics to clients as Server-Sent Events"""
+            def generate():
+                # Let EventSource reconnect on its own if the stream drops
+                yield "retry: 5000\n\n"
+                version = None
+                while True:
+                    with self._stats_changed:
+                        self._stats_changed.wait_for(
+                            lambda: self._stopping or self._stats_version != version, timeout=15
+                        )
+                        if self._stopping:
+                            return
+                        changed = self._stats_version != version
+                        version = self._stats_version
+                    # Idle clients get the pending counts on every tick; they
+                    # come from the shared counts cache, not the scheduler
+                    if changed or not self.current_session:
+                        yield b"data: " + dumps_json(self._get_live_stats()) + b"\n\n"
+                    else:
+                        # Comment line keeps idle connections from being dropped
+                        yield ": keep-alive\n\n"
+            
+            response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['X-Accel-Buffering'] = 'no'
+            return response
+        
+        @self.app.route('/webhook/conversation_event', methods=['POST'])
+        def handle_conversation_event():
+            """Handle conversation events from ElevenLabs"""
+            # Every branch goes through negotiated_response, so msgpack
+            # clients never get a mix of encodings from this endpoint
             try:
                 data = request.json or {}
-                mode = ReviewMode(data.get('mode', 'normal'))
+                event_type = data.get('event_type')
                 
-                # End previous session if exists
-                if self.current_session:
-                    self._end_session()
+                logger.info("Conversation event: %s", event_type)
                 
-                # Create new session
-                import uuid
-                self.current_session = ReviewSession(
-                    id=str(uuid.uuid4()),
-                    start_time=datetime.now(),
-                    mode=mode,
-                    state=SessionState.ACTIVE
-                )
+                # Per-turn events first; session start/end arrive once per session
+                if event_type == 'user_intent':
+                    intent = data.get('intent', '').lower()
+                    entities = data.get('entities', {})
+                    user_message = data.get('user_message', '')
+                    
+                    logger.debug("User intent: %s, entities: %s", intent, entities)
+                    
+                    # Try exact intent match first
+                    if intent in self._intent_handlers:
+                        reply = self._dispatch_intent(intent, data, entities)
+                    else:
+                        # Fallback: intent detection from user message
+                        reply = self._detect_intent_from_message(user_message, entities)
+                
+                elif event_type == 'user_speech':
+                    # Handle direct speech recognition results
+                    transcript = data.get('transcript', '').lower()
+                    confidence = data.get('confidence', 0.0)
+                    
+                    if confidence > 0.7:  # High confidence threshold
+                        reply = self._process_speech_command(transcript)
+                    else:
+                        reply = {
+                            "success": False,
+                            "message": "Could not understand speech clearly. Please try again.",
+                            "confidence": confidence
+                        }
                 
-                # Get initial statistics
-                stats = self._get_session_start_stats()
+                elif event_type == 'session_started':
+                    # Initialize session when conversation starts
+                    reply = self._handle_start_session(data)
                 
-                return jsonify({
-                    "success": True,
-                    "message": f"Starting {mode.value} review session. {stats['message']}",
-                    "session_id": self.current_session.id,
-                    "stats": stats
-                })
+                elif event_type == 'session_ended':
+                    reply = self._handle_end_session()
+                
+                else:
+                    logger.warning(f"Unknown event type: {event_type}")
+                    reply = {
+                        "success": False,
+                        "message": f"Unknown event type: {event_type}"
+                    }
+                
+                return negotiated_response(reply)
+                    
             except Exception as e:
-                logger.error(f"Error starting session: {str(e)}")
-                return jsonify({"success": False, "error": str(e)}), 500
+                logger.error(f"Conversation webhook error: {str(e)}")
+                return negotiated_response(CONVERSATION_ERROR, 500)
         
-        @self.app.route('/get_next_card', methods=['POST'])
-        def get_next_card():
-            """Get the next due card"""
+        @self.app.route('/webhook/audio_stream', methods=['POST'])
+        def handle_audio_stream():
+            """Handle real-time audio streaming for immediate feedback"""
             try:
-                # Ensure session is active
-                if not self.current_session or self.current_session.state != SessionState.ACTIVE:
-                    return jsonify({
-                        "success": False,
-                        "message": "No active session. Please say 'start session' first."
-                    })
-                
-                # Save review data for previous card if exists
-                if self.current_card and hasattr(self, '_current_card_start_time'):
-                    self._log_card_review()
+                data = request.json or {}
+                stream_type = data.get('stream_type')
                 
-                self.current_card = mw.col.sched.getCard()
-                self.is_showing_answer = False
-                self._current_card_start_time = datetime.now()
-                self._hints_used = 0
+                if stream_type == 'partial_transcript':
+                    # Handle partial speech recognition
+                    partial_text = data.get('text', '').lower()
+                    
+                    # Provide immediate feedback for common commands
+                    match = QUICK_COMMAND_RE.search(partial_text)
+                    if match:
+                        command = match.group(1)
+                        return jsonify({
+                            "success": True,
+                            "immediate_feedback": QUICK_RESPONSES[command],
+                            "recognized_command": command
+                        })
                 
-                if not self.current_card:
-                    summary = self._get_session_summary()
+                elif stream_type == 'audio_chunk':
+                    # Handle audio processing (for future enhancement)
                     return jsonify({
                         "success": True,
-                        "message": f"Congratulations! You've completed all your reviews. {summary}",
-                        "cards_remaining": 0,
-                        "session_complete": True
+                        "message": "Audio chunk received"
                     })
                 
-                # Get card content
-                question = self.clean_html(self.current_card.question())
-                card_stats = self._get_card_stats()
+                return jsonify({"success": True})
                 
-                # Check for difficult cards and offer help
-                difficulty_hint = ""
-                if self._is_difficult_card():
-                    difficulty_hint = " This card has been challenging recently. Take your time, and remember you can ask for a hint if needed."
+            except Exception as e:
+                logger.error(f"Audio stream error: {str(e)}")
+                return jsonify({"error": "Stream processing error"}), 500
+        
+        @self.app.route('/manifest.json', methods=['GET'])
+        def serve_manifest():
+            """Serve PWA manifest for mobile installation"""
+            if request.headers.get('If-None-Match') == self._manifest_etag:
+                return '', 304
+            
+            response = self.app.response_class(
+                response=self._manifest_bytes,
+                status=200,
+                mimetype='application/manifest+json'
+            )
+            response.headers['ETag'] = self._manifest_etag
+            response.headers['Cache-Control'] = 'public, max-age=3600'  # Cache for 1 hour
+            return response
+        
+        @self.app.route('/mobile', methods=['GET'])
+        def mobile_interface():
+            """Serve mobile-optimized interface"""
+            try:
+                if request.headers.get('If-None-Match') == self._mobile_html_etag:
+                    return '', 304
                 
+                # Add headers for PWA; no-cache still revalidates on every load
+                response = self.app.response_class(
+                    response=self._mobile_html_bytes,
+                    status=200,
+                    mimetype='text/html'
+                )
+                response.headers['ETag'] = self._mobile_html_etag
+                response.headers['Cache-Control'] = 'no-cache, must-revalidate'
+                return response
+            except Exception as e:
+                logger.error(f"Error serving mobile interface: {str(e)}")
+                return jsonify({"error": "Failed to load mobile interface"}), 500
+        
+        @self.app.route('/offline.html', methods=['GET'])
+        def offline_page():
+            """Serve offline page for PWA"""
+            if request.headers.get('If-None-Match') == OFFLINE_HTML_ETAG:
+                return '', 304
+            
+            response = self.app.response_class(
+                response=OFFLINE_HTML,
+                status=200,
+                mimetype='text/html'
+            )
+            response.headers['Content-Length'] = str(len(OFFLINE_HTML))
+            response.headers['ETag'] = OFFLINE_HTML_ETAG
+            return response
+        
+        @self.app.route('/pwa-info', methods=['GET'])
+        def pwa_info():
+            """Provide PWA installation info and status"""
+            return json_body_response(self._pwa_info_bytes)
+        
+        # Voice Streaming WebSocket Endpoints
+        @self.app.route('/stream/start', methods=['POST'])
+        @json_errors("Start voice stream error")
+        def start_voice_stream():
+            """Start WebSocket voice streaming session"""
+            if not self.voice_stream_handler:
+                return jsonify({
+                    "success": False,
+                    "error": "Voice streaming not available - ELEVENLABS_API_KEY not configured"
+                }), 400
+            
+            # Start streaming session in background
+            self.voice_stream_handler.start_streaming_session()
+            
+            return jsonify({
+                "success": True,
+                "message": "Voice streaming session started",
+                "websocket_url": self.voice_stream_handler.websocket_url,
+                "agent_id": self.voice_stream_handler.agent_id
+            })
+        
+        @self.app.route('/stream/stop', methods=['POST'])
+        @json_errors("Stop voice stream error")
+        def stop_voice_stream():
+            """Stop WebSocket voice streaming session"""
+            if not self.voice_stream_handler:
+                return jsonify({
+                    "success": False,
+                    "error": "Voice streaming not available"
+                }), 400
+            
+            self.voice_stream_handler.stop_streaming_session()
+            
+            return jsonify({
+                "success": True,
+                "message": "Voice streaming session stopped"
+            })
+        
+        @self.app.route('/stream/status', methods=['GET'])
+        @json_errors("Stream status error")
+        def stream_status():
+            """Get voice streaming status"""
+            if not self.voice_stream_handler:
                 return jsonify({
                     "success": True,
-                    "message": f"{card_stats}. The question is: {question}{difficulty_hint}",
-                    "question": question,
-                    "cards_remaining": self._get_remaining_cards(),
-                    "card_type": self.current_card.template()['name'],
-                    "deck": mw.col.decks.name(self.current_card.did),
-                    "tags": self.current_card.note().tags,
-                    "streak": self.current_session.streak
+                    "available": False,
+                    "connected": False,
+                    "reason": "ELEVENLABS_API_KEY not configured"
                 })
-            except Exception as e:
-                logger.error(f"Error getting next card: {str(e)}")
-                return jsonify({"success": False, "error": str(e)}), 500
+            
+            return jsonify({
+                "success": True,
+                "available": True,
+                "connected": self.voice_stream_handler.connected,
+                "reconnect_attempts": self.voice_stream_handler.reconnect_attempts,
+                "max_reconnect_attempts": self.voice_stream_handler.max_reconnect_attempts,
+                "websocket_url": self.voice_stream_handler.websocket_url
+            })
         
-        @self.app.route('/show_answer', methods=['POST'])
-        def show_answer():
-            """Reveal the answer to current card"""
-            try:
-                if not self.current_card:
-                    return jsonify({
-                        "success": False,
-                        "message": "No card is currently loaded. Say 'next card' to get a card."
-                    })
-                
-                if self.is_showing_answer:
-                    return jsonify({
-                        "success": True,
-                        "message": "The answer is already showing. How well did you remember it? You can say: again, hard, good, or easy."
-                    })
-                
-                answer = self.clean_html(self.current_card.answer())
-                self.is_showing_answer = True
-                
-                # Provide rating guidance based on session mode
-                rating_guidance = self._get_rating_guidance()
-                
+        @self.app.route('/stream/send_audio', methods=['POST'])
+        @json_errors("Send audio stream error")
+        def send_audio_stream():
+            """Send audio data via WebSocket streaming"""
+            if not self.voice_stream_handler:
+                return jsonify({
+                    "success": False,
+                    "error": "Voice streaming not available"
+                }), 400
+            
+            # Read the raw body once; cache=False keeps Werkzeug from holding a
+            # second reference, and no form parsing is attempted on audio
+            audio_data = request.get_data(cache=False)
+            if not audio_data:
+                return jsonify({
+                    "success": False,
+                    "error": "No audio data provided"
+                }), 400
+            
+            # Get audio format from headers
+            audio_format = request.headers.get('X-Audio-Format', 'pcm')
+            
+            # Send audio asynchronously
+            async def send_audio():
+                try:
+                    await self.voice_stream_handler.stream_audio(audio_data, audio_format)
+                    return True
+                except Exception as e:
+                    logger.error(f"Audio streaming error: {e}")
+                    return False
+            
+            # Run on the handler's persistent event loop
+            result = self.voice_stream_handler.run_coroutine(send_audio()).result(timeout=5)
+            
+            if result:
                 return jsonify({
                     "success": True,
-                    "message": f"The answer is: {answer}. {rating_guidance}",
-                    "answer": answer,
-                    "time_taken": (datetime.now() - self._current_card_start_time).total_seconds()
+                    "message": "Audio sent successfully",
+                    "bytes_sent": len(audio_data)
                 })
-            except Exception as e:
-                logger.error(f"Error showing answer: {str(e)}")
-                return jsonify({"success": False, "error": str(e)}), 500
+            else:
+                return jsonify({
+                    "success": False,
+                    "error": "Failed to send audio"
+                }), 500
         
-        @self.app.route('/answer_card', methods=['POST'])
-        def answer_card():
-            """Submit an answer rating"""
-            try:
-                data = request.json
-                rating = data.get('rating', '').lower()
-                
-                if not self.current_card:
-                    return jsonify({
-                        "success": False,
-                        "message": "No card to answer. Say 'next card' first."
-                    })
-                
-                if not self.is_showing_answer:
-                    return jsonify({
-                        "success": False,
-                        "message": "Please look at the answer first by saying 'show answer'."
-                    })
-                
-                # Expanded rating mappings for natural language
-                ease_map = {
-                    # Standard ratings
-                    'again': 1, 'hard': 2, 'good': 3, 'easy': 4,
-                    # Natural variations
-                    'repeat': 1, 'forgot': 1, 'missed': 1, 'no': 1, 'incorrect': 1,
-                    'difficult': 2, 'struggled': 2, 'almost': 2, 'partial': 2,
-                    'correct': 3, 'yes': 3, 'got it': 3, 'remembered': 3,
-                    'perfect': 4, 'instant': 4, 'obvious': 4, 'simple': 4
-                }
-                
-                ease = ease_map.get(rating)
-                if not ease:
-                    suggestions = "again (if you didn't remember), hard (if difficult), good (if you got it), or easy (if very simple)"
-                    return jsonify({
+        @self.app.route('/stream/send_text', methods=['POST'])
+        @json_errors("Send text stream error")
+        def send_text_stream():
+            """Send text message via WebSocket streaming"""
+            if not self.voice_stream_handler:
+                return jsonify({
+                    "success": False,
+                    "error": "Voice streaming not available"
+                }), 400
+            
+            data = request.json or {}
+            text = data.get('text', '')
+            context = data.get('context', {})
+            
+            if not text:
+                return jsonify({
+                    "success": False,
+                    "error": "No text provided"
+                }), 400
+            
+            # Send text asynchronously
+            async def send_text():
+                try:
+                    await self.voice_stream_handler.send_text(text, context)
+                    return True
+                except Exception as e:
+                    logger.error(f"Text streaming error: {e}")
+                    return False
+            
+            # Run on the handler's persistent event loop
+            result = self.voice_stream_handler.run_coroutine(send_text()).result(timeout=5)
+            
+            if result:
+                return jsonify({
+                    "success": True,
+                    "message": "Text sent successfully",
+                    "text_length": len(text)
+                })
+            else:
+                return jsonify({
+                    "success": False,
+                    "error": "Failed to send text"
+                }), 500
+        
+        if self.sock:
+            @self.sock.route('/ws/audio')
+            def audio_socket(ws):
+                """Persistent audio stream; every binary frame is one audio chunk"""
+                if not self.voice_stream_handler:
+                    ws.send(json.dumps({
                         "success": False,
-                        "message": f"I didn't understand '{rating}'. Please say: {suggestions}"
-                    })
-                
-                # Update streak
-                if ease > 1:
-                    self.current_session.streak += 1
-                    self.current_session.correct_count += 1
-                    if self.current_session.streak > self.current_session.best_streak:
-                        self.current_session.best_streak = self.current_session.streak
-                else:
-                    self.current_session.streak = 0
-                
-                self.current_session.cards_reviewed += 1
-                
-                # Answer the card (unless in practice mode)
-                if self.current_session.mode != ReviewMode.PRACTICE:
-                    mw.col.sched.answerCard(self.current_card, ease)
+                        "error": "Voice streaming not available"
+                    }))
+                    return
                 
-                # Log the review
-                self._log_card_review(rating)
+                audio_format = request.args.get('format', 'pcm')
                 
-                # Generate encouraging message
-                message = self._generate_feedback_message(ease, rating)
+                # Enough chunks in flight for the writer to merge a full batch;
+                # past that, stop reading frames until a send completes
+                in_flight = threading.BoundedSemaphore(self.voice_stream_handler.max_audio_batch)
                 
-                # Check for streak milestone
-                if self.current_session.streak > 0 and self.current_session.streak % self.config.streak_encouragement_threshold == 0:
-                    message += f" You're on a {self.current_session.streak} card streak! Keep it up!"
+                def send_done(future):
+                    in_flight.release()
+                    if not future.cancelled() and future.exception():
+                        logger.error(f"Audio streaming error: {future.exception()}")
                 
+                while True:
+                    data = ws.receive()
+                    if isinstance(data, str):
+                        logger.debug("Ignoring text frame on audio socket")
+                        continue
+                    
+                    in_flight.acquire()
+                    future = self.voice_stream_handler.run_coroutine(
+                        self.voice_stream_handler.stream_audio(data, audio_format)
+                    )
+                    future.add_done_callback(send_done)
+        
+        @self.app.route('/start_session', methods=['POST'])
+        @json_errors("Error starting session")
+        def start_session():
+            """Start a new review session"""
+            data = request.json or {}
+            mode = parse_review_mode(data.get('mode', 'normal'))
+            if mode is None:
                 return jsonify({
-                    "success": True,
-                    "message": message,
-                    "streak": self.current_session.streak,
-                    "total_reviewed": self.current_session.cards_reviewed,
-                    "accuracy": round(self.current_session.correct_count / self.current_session.cards_reviewed * 100)
-                })
-            except Exception as e:
-                logger.error(f"Error answering card: {str(e)}")
-                return jsonify({"success": False, "error": str(e)}), 500
+                    "success": False,
+                    "error": f"Unknown mode '{data.get('mode')}'. Available modes: {AVAILABLE_MODES}"
+                }), 400
+            
+            # End previous session if exists
+            if self.current_session:
+                self._end_session()
+            
+            # Create new session
+            self.current_session = ReviewSession(
+                id=secrets.token_hex(16),
+                start_time=datetime.now(),
+                mode=mode,
+                state=SessionState.ACTIVE
+            )
+            self._notify_stats_changed()
+            
+            # Get initial statistics
+            stats = self._get_session_start_stats()
+            
+            return jsonify({
+                "success": True,
+                "message": f"Starting {mode.value} review session. {stats['message']}",
+                "session_id": self.current_session.id,
+                "stats": stats
+            })
+        
+        @self.app.route('/get_next_card', methods=['POST'])
+        @json_errors("Error getting next card")
+        def get_next_card():
+            """Get the next due card"""
+            return negotiated_response(self._handle_next_card())
+        
+        @self.app.route('/show_answer', methods=['POST'])
+        @json_errors("Error showing answer")
+        def show_answer():
+            """Reveal the answer to current card"""
+            return negotiated_response(self._handle_show_answer())
+        
+        @self.app.route('/answer_card', methods=['POST'])
+        @json_errors("Error answering card")
+        def answer_card():
+            """Submit an answer rating"""
+            # Same flow as the conversation webhook; the body carries {"rating": ...}
+            return negotiated_response(self._handle_answer_card(request.get_json(silent=True) or {}))
         
         @self.app.route('/get_hint', methods=['POST'])
+        @json_errors("Error generating hint")
         def get_hint():
             """Provide a hint for the current card"""
-            try:
-                if not self.current_card:
-                    return jsonify({
-                        "success": False,
-                        "message": "No card loaded. Say 'next card' first."
-                    })
-                
-                if self.is_showing_answer:
-                    return jsonify({
-                        "success": False,
-                        "message": "The answer is already showing. No need for a hint now!"
-                    })
-                
-                # Track hint usage
-                self._hints_used += 1
-                
-                # Get hint based on hint number
-                hint = self._generate_progressive_hint(self._hints_used)
-                
-                return jsonify({
-                    "success": True,
-                    "message": hint,
-                    "hint_number": self._hints_used
-                })
-            except Exception as e:
-                logger.error(f"Error generating hint: {str(e)}")
-                return jsonify({"success": False, "error": str(e)}), 500
+            return self._handle_get_hint()
         
         @self.app.route('/explain_concept', methods=['POST'])
+        @json_errors("Error explaining concept")
         def explain_concept():
             """Provide a detailed explanation of the current card's concept"""
-            try:
-                if not self.current_card:
-                    return jsonify({
-                        "success": False,
-                        "message": "No card loaded to explain."
-                    })
-                
-                explanation = self._generate_concept_explanation()
-                
-                return jsonify({
-                    "success": True,
-                    "message": explanation,
-                    "explanation": explanation
-                })
-            except Exception as e:
-                logger.error(f"Error explaining concept: {str(e)}")
-                return jsonify({"success": False, "error": str(e)}), 500
+            return self._handle_explain_concept()
         
         @self.app.route('/get_related_cards', methods=['POST'])
+        @json_errors("Error finding related cards")
         def get_related_cards():
             """Find cards related to current topic"""
-            try:
-                if not self.current_card:
-                    return jsonify({
-                        "success": False,
-                        "message": "No card loaded to find related cards."
-                    })
-                
-                related = self._find_related_cards()
-                
-                return jsonify({
-                    "success": True,
-                    "message": f"Found {related['count']} related cards. {related['summary']}",
-                    "related_cards": related
-                })
-            except Exception as e:
-                logger.error(f"Error finding related cards: {str(e)}")
-                return jsonify({"success": False, "error": str(e)}), 500
+            return self._handle_get_related_cards()
         
         @self.app.route('/pause_session', methods=['POST'])
+        @json_errors("Error pausing session")
         def pause_session():
             """Pause the review session"""
-            try:
-                if not self.current_session or self.current_session.state != SessionState.ACTIVE:
-                    return jsonify({
-                        "success": False,
-                        "message": "No active session to pause."
-                    })
-                
-                self.current_session.state = SessionState.PAUSED
-                self.current_session.last_pause_time = datetime.now()
-                
-                return jsonify({
-                    "success": True,
-                    "message": "Session paused. Say 'resume' when you're ready to continue.",
-                    "cards_reviewed": self.current_session.cards_reviewed
-                })
-            except Exception as e:
-                logger.error(f"Error pausing session: {str(e)}")
-                return jsonify({"success": False, "error": str(e)}), 500
+            return self._handle_pause_session()
         
         @self.app.route('/resume_session', methods=['POST'])
+        @json_errors("Error resuming session")
         def resume_session():
             """Resume a paused session"""
-            try:
-                if not self.current_session:
-                    return jsonify({
-                        "success": False,
-                        "message": "No session to resume. Say 'start session' to begin."
-                    })
-                
-                if self.current_session.state != SessionState.PAUSED:
-                    return jsonify({
-                        "success": False,
-                        "message": "Session is not paused."
-                    })
-                
-                # Calculate pause duration
-                if self.current_session.last_pause_time:
-                    pause_duration = datetime.now() - self.current_session.last_pause_time
-                    self.current_session.paused_duration += pause_duration
-                
-                self.current_session.state = SessionState.ACTIVE
-                
-                return jsonify({
-                    "success": True,
-                    "message": "Welcome back! Let's continue reviewing. Say 'next card' when ready.",
-                    "cards_reviewed": self.current_session.cards_reviewed,
-                    "current_streak": self.current_session.streak
-                })
-            except Exception as e:
-                logger.error(f"Error resuming session: {str(e)}")
-                return jsonify({"success": False, "error": str(e)}), 500
+            return self._handle_resume_session()
         
         @self.app.route('/end_session', methods=['POST'])
+        @json_errors("Error ending session")
         def end_session():
             """End the current review session"""
-            try:
-                if not self.current_session:
-                    return jsonify({
-                        "success": False,
-                        "message": "No active session to end."
-                    })
-                
-                summary = self._get_session_summary()
-                self._end_session()
-                
-                return jsonify({
-                    "success": True,
-                    "message": f"Session ended. {summary}",
-                    "summary": summary
-                })
-            except Exception as e:
-                logger.error(f"Error ending session: {str(e)}")
-                return jsonify({"success": False, "error": str(e)}), 500
+            return self._handle_end_session()
         
         @self.app.route('/get_statistics', methods=['POST'])
+        @json_errors("Error getting statistics")
         def get_statistics():
             """Get detailed review statistics"""
-            try:
-                data = request.json or {}
-                period = data.get('period', 'today')  # today, week, month, all
-                
-                stats = self._get_detailed_statistics(period)
-                
-                return jsonify({
-                    "success": True,
-                    "message": stats['summary'],
-                    "stats": stats
-                })
-            except Exception as e:
-                logger.error(f"Error getting statistics: {str(e)}")
-                return jsonify({"success": False, "error": str(e)}), 500
+            data = request.get_json(silent=True) or {}
+            data.setdefault('period', 'today')  # today, week, month, all, current
+            return self._handle_get_statistics(data)
         
         @self.app.route('/set_review_mode', methods=['POST'])
+        @json_errors("Error setting review mode")
         def set_review_mode():
             """Switch between different review modes"""
-            try:
-                data = request.json
-                mode = data.get('mode', 'normal')
-                
-                if mode not in [m.value for m in ReviewMode]:
-                    return jsonify({
-                        "success": False,
-                        "message": f"Unknown mode '{mode}'. Available modes: normal, speed, focus, practice"
-                    })
-                
-                if self.current_session:
-                    self.current_session.mode = ReviewMode(mode)
-                    
-                mode_descriptions = {
-                    ReviewMode.NORMAL: "Standard review with full features",
-                    ReviewMode.SPEED: "Quick reviews with time pressure",
-                    ReviewMode.FOCUS: "Serious mode with no hints and stricter ratings",
-                    ReviewMode.PRACTICE: "Practice mode - reviews don't affect scheduling"
-                }
-                
+            data = request.json
+            mode = data.get('mode', 'normal')
+            review_mode = parse_review_mode(mode)
+            
+            if review_mode is None:
                 return jsonify({
-                    "success": True,
-                    "message": f"Switched to {mode} mode. {mode_descriptions[ReviewMode(mode)]}",
-                    "mode": mode
+                    "success": False,
+                    "message": f"Unknown mode '{mode}'. Available modes: {AVAILABLE_MODES}"
                 })
-            except Exception as e:
-                logger.error(f"Error setting review mode: {str(e)}")
-                return jsonify({"success": False, "error": str(e)}), 500
+            
+            if self.current_session:
+                self.current_session.mode = review_mode
+                
+            return jsonify({
+                "success": True,
+                "message": f"Switched to {mode} mode. {MODE_DESCRIPTIONS[review_mode]}",
+                "mode": mode
+            })
     
     # Helper methods
     
+    def _build_intent_handlers(self):
+        """Map conversation intents to their handlers and argument kinds"""
+        return MappingProxyType({
+            'start_review': (self._handle_start_session, IntentArgs.DATA),
+            'start_session': (self._handle_start_session, IntentArgs.DATA),
+            'next_card': (self._handle_next_card, IntentArgs.NONE),
+            'show_answer': (self._handle_show_answer, IntentArgs.NONE),
+            'rate_card': (self._handle_answer_card, IntentArgs.ENTITIES),
+            'answer_card': (self._handle_answer_card, IntentArgs.ENTITIES),
+            'get_hint': (self._handle_get_hint, IntentArgs.NONE),
+            'pause': (self._handle_pause_session, IntentArgs.NONE),
+            'resume': (self._handle_resume_session, IntentArgs.NONE),
+            'statistics': (self._handle_get_statistics, IntentArgs.DATA),
+            'end_session': (self._handle_end_session, IntentArgs.NONE),
+            'explain': (self._handle_explain_concept, IntentArgs.NONE),
+            'related_cards': (self._handle_get_related_cards, IntentArgs.NONE)
+        })
+    
+    def _dispatch_intent(self, intent: str, data: Dict[str, Any], entities: Dict[str, Any]):
+        """Call the handler registered for intent with the arguments it expects"""
+        handler, args = self._intent_handlers[intent]
+        if args is IntentArgs.DATA:
+            return handler(data)
+        if args is IntentArgs.ENTITIES:
+            return handler(entities)
+        return handler()
+    
+    def _notify_stats_changed(self):
+        """Wake /events/stats streams so they push a fresh snapshot"""
+        with self._stats_changed:
+            self._stats_version += 1
+            self._stats_changed.notify_all()
+    
+    def invalidate_card_counts(self):
+        """Drop cached scheduler counts after the collection's queues change"""
+        self._counts_cache = None
+        self._notify_stats_changed()
+    
+    def _get_live_stats(self) -> Dict[str, Any]:
+        """Current session statistics, or pending card counts when idle"""
+        if not self.current_session:
+            return _pending_card_stats(self._sched_counts)
+        
+        accuracy = 0
+        if self.current_session.cards_reviewed > 0:
+            accuracy = percent(self.current_session.correct_count, self.current_session.cards_reviewed)
+        
+        return {
+            "success": True,
+            "session_active": True,
+            "cards_reviewed": self.current_session.cards_reviewed,
+            "streak": self.current_session.streak,
+            "best_streak": self.current_session.best_streak,
+            "accuracy": accuracy,
+            "mode": self.current_session.mode.value,
+            "state": self.current_session.state.value
+        }
+    
     # Webhook conversation flow helper methods
     def _handle_start_session(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle session start from conversation webhook"""
-        try:
-            mode = data.get('mode', 'normal')
-            if mode not in [m.value for m in ReviewMode]:
-                mode = 'normal'
-            
-            # End previous session if exists
-            if self.current_session:
-                self._end_session()
-            
-            # Create new session
-            import uuid
-            self.current_session = ReviewSession(
-                id=str(uuid.uuid4()),
-                start_time=datetime.now(),
-                mode=ReviewMode(mode),
-                state=SessionState.ACTIVE
-            )
-            
-            # Get initial statistics
-            stats = self._get_session_start_stats()
-            
-            return jsonify({
-                "success": True,
-                "message": f"Great! I've started a {mode} review session. {stats['message']} Let's begin reviewing!",
-                "session_id": self.current_session.id,
-                "stats": stats,
-                "next_action": "say 'next card' to get your first question"
-            })
-        except Exception as e:
-            logger.error(f"Error starting session: {str(e)}")
-            return jsonify({"success": False, "error": str(e)}), 500
+        mode = parse_review_mode(data.get('mode', 'normal')) or ReviewMode.NORMAL
+        
+        # End previous session if exists
+        if self.current_session:
+            self._end_session()
+        
+        # Create new session
+        self.current_session = ReviewSession(
+            id=secrets.token_hex(16),
+            start_time=datetime.now(),
+            mode=mode,
+            state=SessionState.ACTIVE
+        )
+        self._notify_stats_changed()
+        
+        # Get initial statistics
+        stats = self._get_session_start_stats()
+        
+        return {
+            "success": True,
+            "message": f"Great! I've started a {mode.value} review session. {stats['message']} Let's begin reviewing!",
+            "session_id": self.current_session.id,
+            "stats": stats,
+            "next_action": "say 'next card' to get your first question"
+        }
     
     def _handle_next_card(self) -> Dict[str, Any]:
         """Handle next card request from conversation"""
-        try:
-            # Ensure session is active
-            if not self.current_session or self.current_session.state != SessionState.ACTIVE:
-                return jsonify({
-                    "success": False,
-                    "message": "No active session. Please say 'start session' first to begin reviewing."
-                })
-            
-            # Save review data for previous card if exists
-            if self.current_card and hasattr(self, '_current_card_start_time'):
-                self._log_card_review()
-            
-            self.current_card = mw.col.sched.getCard()
-            self.is_showing_answer = False
-            self._current_card_start_time = datetime.now()
-            self._hints_used = 0
-            
-            if not self.current_card:
-                summary = self._get_session_summary()
-                return jsonify({
-                    "success": True,
-                    "message": f"Congratulations! You've completed all your reviews for now. {summary}",
-                    "cards_remaining": 0,
-                    "session_complete": True
-                })
-            
-            # Get card content
-            question = self.clean_html(self.current_card.question())
-            card_stats = self._get_card_stats()
-            
-            # Check for difficult cards and offer help
-            difficulty_hint = ""
-            if self._is_difficult_card():
-                difficulty_hint = " This card has been challenging recently. Take your time, and remember you can ask for a hint if needed."
-            
-            return jsonify({
+        # Ensure session is active
+        if not self.current_session or self.current_session.state != SessionState.ACTIVE:
+            return {
+                "success": False,
+                "message": "No active session. Please say 'start session' first to begin reviewing."
+            }
+        
+        # Save review data for previous card if exists
+        if self.current_card and hasattr(self, '_current_card_start_time'):
+            self._log_card_review()
+        
+        self.current_card = mw.col.sched.getCard()
+        self._cache_current_card()
+        self.is_showing_answer = False
+        self._current_card_start_time = time.monotonic()
+        self._hints_used = 0
+        
+        if not self.current_card:
+            summary = self._get_session_summary()
+            return {
                 "success": True,
-                "message": f"{card_stats}. The question is: {question}{difficulty_hint}",
-                "question": question,
-                "cards_remaining": self._get_remaining_cards(),
-                "card_type": self.current_card.template()['name'],
-                "deck": mw.col.decks.name(self.current_card.did),
-                "streak": self.current_session.streak,
-                "next_action": "think about the answer, then say 'show answer' when ready"
-            })
-        except Exception as e:
-            logger.error(f"Error getting next card: {str(e)}")
-            return jsonify({"success": False, "error": str(e)}), 500
+                "message": f"Congratulations! You've completed all your reviews for now. {summary}",
+                "cards_remaining": 0,
+                "session_complete": True
+            }
+        
+        # Get card content
+        question = self._card_cache['question']
+        card_stats = self._get_card_stats()
+        
+        # Check for difficult cards and offer help
+        difficulty_hint = ""
+        if self._is_difficult_card():
+            difficulty_hint = " This card has been challenging recently. Take your time, and remember you can ask for a hint if needed."
+        
+        return {
+            "success": True,
+            "message": f"{card_stats}. The question is: {question}{difficulty_hint}",
+            "question": question,
+            "cards_remaining": self._get_remaining_cards(),
+            "card_type": self._card_cache['card_type'],
+            "deck": self._card_cache['deck'],
+            "tags": self._card_cache['tags'],
+            "streak": self.current_session.streak,
+            "next_action": "think about the answer, then say 'show answer' when ready"
+        }
     
     def _handle_show_answer(self) -> Dict[str, Any]:
         """Handle show answer request from conversation"""
-        try:
-            if not self.current_card:
-                return jsonify({
-                    "success": False,
-                    "message": "No card is currently loaded. Say 'next card' to get a card first."
-                })
-            
-            if self.is_showing_answer:
-                return jsonify({
-                    "success": True,
-                    "message": "The answer is already showing. How well did you remember it? You can say: again, hard, good, or easy."
-                })
-            
-            answer = self.clean_html(self.current_card.answer())
-            self.is_showing_answer = True
-            
-            # Provide rating guidance based on session mode
-            rating_guidance = self._get_rating_guidance()
-            
-            return jsonify({
+        if not self.current_card:
+            return {
+                "success": False,
+                "message": "No card is currently loaded. Say 'next card' to get a card first."
+            }
+        
+        if self.is_showing_answer:
+            return {
                 "success": True,
-                "message": f"The answer is: {answer}. {rating_guidance}",
-                "answer": answer,
-                "time_taken": (datetime.now() - self._current_card_start_time).total_seconds(),
-                "next_action": "rate how well you remembered: again, hard, good, or easy"
-            })
-        except Exception as e:
-            logger.error(f"Error showing answer: {str(e)}")
-            return jsonify({"success": False, "error": str(e)}), 500
+                "message": "The answer is already showing. How well did you remember it? You can say: again, hard, good, or easy."
+            }
+        
+        answer = self._card_cache['answer']
+        self.is_showing_answer = True
+        
+        # Provide rating guidance based on session mode
+        rating_guidance = self._get_rating_guidance()
+        
+        return {
+            "success": True,
+            "message": f"The answer is: {answer}. {rating_guidance}",
+            "answer": answer,
+            "time_taken": time.monotonic() - self._current_card_start_time,
+            "next_action": "rate how well you remembered: again, hard, good, or easy"
+        }
     
     def _handle_answer_card(self, entities: Dict[str, Any]) -> Dict[str, Any]:
         """Handle card rating from conversation"""
-        try:
-            rating = entities.get('rating', '').lower() if entities else ''
-            
-            if not self.current_card:
-                return jsonify({
-                    "success": False,
-                    "message": "No card to answer. Say 'next card' first."
-                })
-            
-            if not self.is_showing_answer:
-                return jsonify({
-                    "success": False,
-                    "message": "Please look at the answer first by saying 'show answer'."
-                })
-            
-            # Expanded rating mappings for natural language
-            ease_map = {
-                # Standard ratings
-                'again': 1, 'hard': 2, 'good': 3, 'easy': 4,
-                # Natural variations
-                'repeat': 1, 'forgot': 1, 'missed': 1, 'no': 1, 'incorrect': 1, 'wrong': 1,
-                'difficult': 2, 'struggled': 2, 'almost': 2, 'partial': 2, 'tough': 2,
-                'correct': 3, 'yes': 3, 'got it': 3, 'remembered': 3, 'right': 3, 'ok': 3,
-                'perfect': 4, 'instant': 4, 'obvious': 4, 'simple': 4, 'trivial': 4
+        entities = entities or {}
+        rating = entities.get('rating', '').lower()
+        
+        if not self.current_card:
+            return {
+                "success": False,
+                "message": "No card to answer. Say 'next card' first."
             }
-            
-            ease = ease_map.get(rating)
-            if not ease:
-                suggestions = "again (if you didn't remember), hard (if difficult), good (if you got it), or easy (if very simple)"
-                return jsonify({
-                    "success": False,
-                    "message": f"I didn't understand '{rating}'. Please say: {suggestions}",
-                    "valid_ratings": list(ease_map.keys())
-                })
-            
-            # Update streak
-            if ease > 1:
-                self.current_session.streak += 1
-                self.current_session.correct_count += 1
-                if self.current_session.streak > self.current_session.best_streak:
-                    self.current_session.best_streak = self.current_session.streak
-            else:
-                self.current_session.streak = 0
-            
-            self.current_session.cards_reviewed += 1
-            
-            # Answer the card (unless in practice mode)
-            if self.current_session.mode != ReviewMode.PRACTICE:
-                mw.col.sched.answerCard(self.current_card, ease)
-            
-            # Log the review
-            self._log_card_review(rating)
-            
+        
+        if not self.is_showing_answer:
+            return {
+                "success": False,
+                "message": "Please look at the answer first by saying 'show answer'."
+            }
+        
+        ease = EASE_MAP.get(rating, 0)
+        if ease == 0:
+            suggestions = "again (if you didn't remember), hard (if difficult), good (if you got it), or easy (if very simple)"
+            return {
+                "success": False,
+                "message": f"I didn't understand '{rating}'. Please say: {suggestions}",
+                "valid_ratings": VALID_RATINGS
+            }
+        
+        # Update streak
+        session = self.current_session
+        if ease > 1:
+            session.streak += 1
+            session.correct_count += 1
+            if session.streak > session.best_streak:
+                session.best_streak = session.streak
+        else:
+            session.streak = 0
+        
+        session.cards_reviewed += 1
+        
+        # Answer the card (unless in practice mode)
+        if session.mode != ReviewMode.PRACTICE:
+            mw.col.sched.answerCard(self.current_card, ease)
+            self._counts_cache = None
+        
+        # Log the review
+        self._log_card_review(rating)
+        self._notify_stats_changed()
+        
+        # Clients that only read the counters (e.g. speed mode) can skip the spoken text
+        message = ""
+        if not entities.get('brief'):
             # Generate encouraging message
             message = self._generate_feedback_message(ease, rating)
             
             # Check for streak milestone
-            if self.current_session.streak > 0 and self.current_session.streak % self.config.streak_encouragement_threshold == 0:
-                message += f" You're on a {self.current_session.streak} card streak! Keep it up!"
-            
-            return jsonify({
-                "success": True,
-                "message": message,
-                "streak": self.current_session.streak,
-                "total_reviewed": self.current_session.cards_reviewed,
-                "accuracy": round(self.current_session.correct_count / self.current_session.cards_reviewed * 100),
-                "next_action": "say 'next card' to continue"
-            })
-        except Exception as e:
-            logger.error(f"Error answering card: {str(e)}")
-            return jsonify({"success": False, "error": str(e)}), 500
-    
-    def _handle_get_hint(self) -> Dict[str, Any]:
-        """Handle hint request from conversation"""
-        try:
-            if not self.current_card:
-                return jsonify({
-                    "success": False,
-                    "message": "No card loaded. Say 'next card' first."
-                })
-            
-            if self.is_showing_answer:
-                return jsonify({
-                    "success": False,
-                    "message": "The answer is already showing. No need for a hint now!"
-                })
-            
-            # Track hint usage
-            self._hints_used += 1
-            
-            # Get hint based on hint number
-            hint = self._generate_progressive_hint(self._hints_used)
-            
-            return jsonify({
-                "success": True,
-                "message": hint,
-                "hint_number": self._hints_used,
-                "next_action": "keep thinking, ask for another hint, or say 'show answer'"
-            })
-        except Exception as e:
-            logger.error(f"Error generating hint: {str(e)}")
-            return jsonify({"success": False, "error": str(e)}), 500
+            streak = session.streak
+            if streak and streak % self.config.streak_encouragement_threshold == 0:
+                message += f" You're on a {streak} card streak! Keep it up!"
+        
+        return {
+            "success": True,
+            "message": message,
+            "streak": session.streak,
+            "total_reviewed": session.cards_reviewed,
+            "accuracy": percent(session.correct_count, session.cards_reviewed),
+            "next_action": "say 'next card' to continue"
+        }
+    
+    def _handle_get_hint(self) -> Dict[str, Any]:
+        """Handle hint request from conversation"""
+        if not self.current_card:
+            return {
+                "success": False,
+                "message": "No card loaded. Say 'next card' first."
+            }
+        
+        if self.is_showing_answer:
+            return {
+                "success": False,
+                "message": "The answer is already showing. No need for a hint now!"
+            }
+        
+        # Track hint usage
+        self._hints_used += 1
+        
+        # Get hint based on hint number
+        hint = self._generate_progressive_hint(self._hints_used)
+        
+        return {
+            "success": True,
+            "message": hint,
+            "hint_number": self._hints_used,
+            "next_action": "keep thinking, ask for another hint, or say 'show answer'"
+        }
     
     def _handle_pause_session(self) -> Dict[str, Any]:
         """Handle session pause from conversation"""
-        try:
-            if not self.current_session or self.current_session.state != SessionState.ACTIVE:
-                return jsonify({
-                    "success": False,
-                    "message": "No active session to pause."
-                })
-            
-            self.current_session.state = SessionState.PAUSED
-            self.current_session.last_pause_time = datetime.now()
-            
-            return jsonify({
-                "success": True,
-                "message": "Session paused. Say 'resume' when you're ready to continue studying.",
-                "cards_reviewed": self.current_session.cards_reviewed,
-                "next_action": "say 'resume' to continue"
-            })
-        except Exception as e:
-            logger.error(f"Error pausing session: {str(e)}")
-            return jsonify({"success": False, "error": str(e)}), 500
+        if not self.current_session or self.current_session.state != SessionState.ACTIVE:
+            return {
+                "success": False,
+                "message": "No active session to pause."
+            }
+        
+        self.current_session.state = SessionState.PAUSED
+        self._notify_stats_changed()
+        self.current_session.last_pause_time = datetime.now()
+        
+        return {
+            "success": True,
+            "message": "Session paused. Say 'resume' when you're ready to continue studying.",
+            "cards_reviewed": self.current_session.cards_reviewed,
+            "next_action": "say 'resume' to continue"
+        }
     
     def _handle_resume_session(self) -> Dict[str, Any]:
         """Handle session resume from conversation"""
-        try:
-            if not self.current_session:
-                return jsonify({
-                    "success": False,
-                    "message": "No session to resume. Say 'start session' to begin."
-                })
-            
-            if self.current_session.state != SessionState.PAUSED:
-                return jsonify({
-                    "success": False,
-                    "message": "Session is not paused."
-                })
-            
-            # Calculate pause duration
-            if self.current_session.last_pause_time:
-                pause_duration = datetime.now() - self.current_session.last_pause_time
-                self.current_session.paused_duration += pause_duration
-            
-            self.current_session.state = SessionState.ACTIVE
-            
-            return jsonify({
-                "success": True,
-                "message": "Welcome back! Let's continue reviewing. Say 'next card' when you're ready.",
-                "cards_reviewed": self.current_session.cards_reviewed,
-                "current_streak": self.current_session.streak,
-                "next_action": "say 'next card' to continue"
-            })
-        except Exception as e:
-            logger.error(f"Error resuming session: {str(e)}")
-            return jsonify({"success": False, "error": str(e)}), 500
+        if not self.current_session:
+            return {
+                "success": False,
+                "message": "No session to resume. Say 'start session' to begin."
+            }
+        
+        if self.current_session.state != SessionState.PAUSED:
+            return {
+                "success": False,
+                "message": "Session is not paused."
+            }
+        
+        # Calculate pause duration
+        if self.current_session.last_pause_time:
+            pause_duration = datetime.now() - self.current_session.last_pause_time
+            self.current_session.paused_duration += pause_duration
+        
+        self.current_session.state = SessionState.ACTIVE
+        self._notify_stats_changed()
+        
+        return {
+            "success": True,
+            "message": "Welcome back! Let's continue reviewing. Say 'next card' when you're ready.",
+            "cards_reviewed": self.current_session.cards_reviewed,
+            "current_streak": self.current_session.streak,
+            "next_action": "say 'next card' to continue"
+        }
     
     def _handle_end_session(self) -> Dict[str, Any]:
         """Handle session end from conversation"""
-        try:
-            if not self.current_session:
-                return jsonify({
-                    "success": False,
-                    "message": "No active session to end."
-                })
-            
-            summary = self._get_session_summary()
-            self._end_session()
-            
-            return jsonify({
-                "success": True,
-                "message": f"Great work! Session ended. {summary} Thanks for studying with me!",
-                "summary": summary,
-                "next_action": "say 'start session' to begin a new review session"
-            })
-        except Exception as e:
-            logger.error(f"Error ending session: {str(e)}")
-            return jsonify({"success": False, "error": str(e)}), 500
+        if not self.current_session:
+            return {
+                "success": False,
+                "message": "No active session to end."
+            }
+        
+        summary = self._end_session() or "No session data available."
+        
+        return {
+            "success": True,
+            "message": f"Great work! Session ended. {summary} Thanks for studying with me!",
+            "summary": summary,
+            "next_action": "say 'start session' to begin a new review session"
+        }
     
     def _handle_get_statistics(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle statistics request from conversation"""
-        try:
-            period = data.get('period', 'current')
+        period = data.get('period', 'current')
+        
+        if period == 'current' and self.current_session:
+            accuracy = 0
+            if self.current_session.cards_reviewed > 0:
+                accuracy = percent(self.current_session.correct_count, self.current_session.cards_reviewed)
             
-            if period == 'current' and self.current_session:
-                accuracy = 0
-                if self.current_session.cards_reviewed > 0:
-                    accuracy = round(self.current_session.correct_count / self.current_session.cards_reviewed * 100)
-                
-                message = f"In this session: {self.current_session.cards_reviewed} cards reviewed, "
-                message += f"{accuracy}% accuracy, {self.current_session.streak} current streak, "
-                message += f"{self.current_session.best_streak} best streak"
-                
-                return jsonify({
-                    "success": True,
-                    "message": message,
-                    "current_session": True,
-                    "stats": {
-                        "cards_reviewed": self.current_session.cards_reviewed,
-                        "accuracy": accuracy,
-                        "streak": self.current_session.streak,
-                        "best_streak": self.current_session.best_streak
-                    }
-                })
-            else:
-                stats = self._get_detailed_statistics(period)
-                return jsonify({
-                    "success": True,
-                    "message": stats['summary'],
-                    "stats": stats
-                })
-        except Exception as e:
-            logger.error(f"Error getting statistics: {str(e)}")
-            return jsonify({"success": False, "error": str(e)}), 500
+            message = f"In this session: {self.current_session.cards_reviewed} cards reviewed, "
+            message += f"{accuracy}% accuracy, {self.current_session.streak} current streak, "
+            message += f"{self.current_session.best_streak} best streak"
+            
+            return {
+                "success": True,
+                "message": message,
+                "current_session": True,
+                "stats": {
+                    "cards_reviewed": self.current_session.cards_reviewed,
+                    "accuracy": accuracy,
+                    "streak": self.current_session.streak,
+                    "best_streak": self.current_session.best_streak
+                }
+            }
+        else:
+            stats = self._get_detailed_statistics(period)
+            return {
+                "success": True,
+                "message": stats['summary'],
+                "stats": stats
+            }
     
     def _handle_explain_concept(self) -> Dict[str, Any]:
         """Handle concept explanation request from conversation"""
-        try:
-            if not self.current_card:
-                return jsonify({
-                    "success": False,
-                    "message": "No card loaded to explain."
-                })
-            
-            explanation = self._generate_concept_explanation()
-            
-            return jsonify({
-                "success": True,
-                "message": explanation,
-                "explanation": explanation
-            })
-        except Exception as e:
-            logger.error(f"Error explaining concept: {str(e)}")
-            return jsonify({"success": False, "error": str(e)}), 500
+        if not self.current_card:
+            return {
+                "success": False,
+                "message": "No card loaded to explain."
+            }
+        
+        explanation = self._generate_concept_explanation()
+        
+        return {
+            "success": True,
+            "message": explanation,
+            "explanation": explanation
+        }
     
     def _handle_get_related_cards(self) -> Dict[str, Any]:
         """Handle related cards request from conversation"""
-        try:
-            if not self.current_card:
-                return jsonify({
-                    "success": False,
-                    "message": "No card loaded to find related cards."
-                })
-            
-            related = self._find_related_cards()
-            
-            return jsonify({
-                "success": True,
-                "message": f"Found {related['count']} related cards. {related['summary']}",
-                "related_cards": related
-            })
-        except Exception as e:
-            logger.error(f"Error finding related cards: {str(e)}")
-            return jsonify({"success": False, "error": str(e)}), 500
+        if not self.current_card:
+            return {
+                "success": False,
+                "message": "No card loaded to find related cards."
+            }
+        
+        related = self._find_related_cards()
+        
+        return {
+            "success": True,
+            "message": f"Found {related['count']} related cards. {related['summary']}",
+            "related_cards": related
+        }
     
     def _detect_intent_from_message(self, user_message: str, entities: Dict[str, Any]) -> Dict[str, Any]:
         """Fallback intent detection from user message"""
-        try:
-            message = user_message.lower().strip()
-            
-            # Intent detection patterns
-            intent_patterns = {
-                'next_card': ['next', 'continue', 'another', 'more'],
-                'show_answer': ['answer', 'solution', 'reveal', 'show', 'tell me'],
-                'get_hint': ['hint', 'help', 'clue', 'tip'],
-                'rate_card': ['again', 'hard', 'good', 'easy', 'difficult', 'correct', 'wrong'],
-                'pause': ['pause', 'stop', 'break', 'wait'],
-                'resume': ['resume', 'continue', 'back', 'unpause'],
-                'statistics': ['stats', 'statistics', 'progress', 'how am i doing'],
-                'end_session': ['end', 'finish', 'done', 'quit', 'stop session']
-            }
-            
-            # Check for intent patterns
-            for intent, patterns in intent_patterns.items():
-                if any(pattern in message for pattern in patterns):
-                    if intent == 'next_card':
-                        return self._handle_next_card()
-                    elif intent == 'show_answer':
-                        return self._handle_show_answer()
-                    elif intent == 'get_hint':
-                        return self._handle_get_hint()
-                    elif intent == 'rate_card':
-                        # Extract rating from message
-                        entities['rating'] = message
-                        return self._handle_answer_card(entities)
-                    elif intent == 'pause':
-                        return self._handle_pause_session()
-                    elif intent == 'resume':
-                        return self._handle_resume_session()
-                    elif intent == 'statistics':
-                        return self._handle_get_statistics({})
-                    elif intent == 'end_session':
-                        return self._handle_end_session()
-            
-            # No intent detected
-            return jsonify({
-                "success": False,
-                "message": "I didn't understand that. Try saying: 'next card', 'show answer', 'get hint', or 'statistics'",
-                "available_commands": ["next card", "show answer", "hint", "again/hard/good/easy", "pause", "statistics", "end session"]
-            })
-            
-        except Exception as e:
-            logger.error(f"Error detecting intent: {str(e)}")
-            return jsonify({"success": False, "error": str(e)}), 500
+        message = user_message.lower().strip()
+        
+        # Check for intent patterns
+        for intent, pattern in INTENT_PATTERNS:
+            if pattern.search(message):
+                if intent == 'rate_card':
+                    # Extract rating from message
+                    entities['rating'] = message
+                return self._dispatch_intent(intent, {}, entities)
+        
+        # No intent detected
+        return {
+            "success": False,
+            "message": "I didn't understand that. Try saying: 'next card', 'show answer', 'get hint', or 'statistics'",
+            "available_commands": ["next card", "show answer", "hint", "again/hard/good/easy", "pause", "statistics", "end session"]
+        }
     
     def _process_speech_command(self, transcript: str) -> Dict[str, Any]:
         """Process direct speech recognition results"""
-        try:
-            # Use the same intent detection logic
-            return self._detect_intent_from_message(transcript, {})
-        except Exception as e:
-            logger.error(f"Error processing speech: {str(e)}")
-            return jsonify({"success": False, "error": str(e)}), 500
+        # Use the same intent detection logic
+        return self._detect_intent_from_message(transcript, {})
+    
+    def _cache_current_card(self):
+        """Render and clean the loaded card's text once, for every turn that needs it"""
+        card = self.current_card
+        if not card:
+            self._card_cache = {}
+            return
+        
+        note = card.note()
+        self._card_cache = {
+            'question': self.clean_html(card.question()),
+            'answer': self.clean_html(card.answer()),
+            'card_type': card.template()['name'],
+            'deck': deck_name(card.did),
+            'note': note,
+            'tags': note.tags
+        }
     
-    def clean_html(self, text: str) -> str:
+    def _card_fields(self) -> Dict[str, str]:
+        """Cleaned note fields of the current card, built on first use"""
+        fields = self._card_cache.get('fields')
+        if fields is None:
+            note = self._card_cache['note']
+            fields = self._card_cache['fields'] = {name: self.clean_html(value) for name, value in note.items()}
+        return fields
+    
+    def _clean_html(self, text: str) -> str:
         """Convert HTML to clean text for speech"""
         # Handle cloze deletions
-        text = re.sub(r'\{\{c\d+::(.*?)\}\}', r'\1', text)
-        
-        # Convert to plain text
-        plain_text = self.h2t.handle(text).strip()
+        text = CLOZE_RE.sub(r'\1', text)
         
-        # Clean up common artifacts
-        plain_text = re.sub(r'\s+', ' ', plain_text)  # Multiple spaces
-        plain_text = re.sub(r'&nbsp;', ' ', plain_text)  # Non-breaking spaces
+        # Convert to plain text; selectolax parses in C, html2text is pure Python
+        if HTMLParser:
+            tree = HTMLParser(text)
+            tree.strip_tags(['style', 'script'])  # Card HTML embeds the note type's CSS
+            plain_text = tree.text(separator=' ')
+        else:
+            plain_text = self.h2t.handle(text)
         
-        return plain_text
+        # Collapse whitespace runs and leftover non-breaking spaces in one pass
+        return SPEECH_SPACE_RE.sub(' ', plain_text).strip()
     
     def _get_card_stats(self) -> str:
         """Get speaking-friendly card statistics"""
@@ -3862,49 +4005,41 @@ class AnkiVoiceReviewServer:
             return "Here's a new card"
         elif self.current_card.type == 1:
             return "This is a learning card"
-        else:
-            interval = self.current_card.ivl
-            if interval == 1:
-                return "Review card from yesterday"
-            elif interval < 7:
-                return f"Review card from {interval} days ago"
-            elif interval < 21:
-                weeks = interval // 7
-                return f"Review card from about {weeks} week{'s' if weeks > 1 else ''} ago"
-            elif interval < 365:
-                months = interval // 30
-                return f"Mature card from about {months} month{'s' if months > 1 else ''} ago"
-            else:
-                years = interval // 365
-                return f"Very mature card from about {years} year{'s' if years > 1 else ''} ago"
+        
+        interval = self.current_card.ivl
+        template, unit = INTERVAL_PHRASES[bisect_right(INTERVAL_THRESHOLDS, interval)]
+        count = interval // unit
+        return template.format(n=count, s='s' if count > 1 else '')
+    
+    def _sched_counts(self) -> Tuple[int, int, int]:
+        """Scheduler (new, learning, review) counts"""
+        # Counts only move when a card is answered, so reuse them between turns
+        if self._counts_cache is None:
+            self._counts_cache = tuple(mw.col.sched.counts())
+        return self._counts_cache
     
     def _get_remaining_cards(self) -> int:
         """Get count of remaining cards"""
-        counts = mw.col.sched.counts()
-        return sum(counts)
+        return sum(self._sched_counts())
     
     def _is_difficult_card(self) -> bool:
         """Check if current card has been difficult recently"""
         if not self.current_card:
             return False
         
-        # Check recent reviews
-        reviews = mw.col.db.all(
-            "SELECT ease FROM revlog WHERE cid = ? ORDER BY id DESC LIMIT 5",
+        # Share of "again" answers among the last few reviews, aggregated in SQLite
+        again_fraction, reviews = mw.col.db.first(
+            "SELECT AVG(ease = 1), COUNT(*) FROM "
+            "(SELECT ease FROM revlog WHERE cid = ? ORDER BY id DESC LIMIT 5)",
             self.current_card.id
         )
         
-        if not reviews:
-            return False
-        
         # If more than threshold of recent reviews were "again"
-        again_count = sum(1 for r in reviews if r[0] == 1)
-        return again_count / len(reviews) > self.config.difficulty_threshold
+        return reviews > 0 and again_fraction > self.config.difficulty_threshold
     
     def _generate_progressive_hint(self, hint_number: int) -> str:
         """Generate hints that get progressively more helpful"""
-        note = self.current_card.note()
-        fields = {name: self.clean_html(value) for name, value in note.items()}
+        fields = self._card_fields()
         answer = fields.get('Back', fields.get('Answer', ''))
         
         if hint_number == 1:
@@ -3934,8 +4069,8 @@ class AnkiVoiceReviewServer:
     
     def _generate_concept_explanation(self) -> str:
         """Generate an explanation for the current card's concept"""
-        note = self.current_card.note()
-        fields = {name: self.clean_html(value) for name, value in note.items()}
+        note = self._card_cache['note']
+        fields = self._card_fields()
         
         # Check for explanation field
         explanation = fields.get('Explanation', fields.get('Extra', ''))
@@ -3957,29 +4092,24 @@ class AnkiVoiceReviewServer:
         if not self.current_card:
             return {"count": 0, "summary": "No card loaded"}
         
-        note = self.current_card.note()
+        note = self._card_cache['note']
         tags = note.tags
         
-        related_cards = []
+        current = {self.current_card.id}
         
         # Find by tags
-        if tags:
-            tag_query = " or ".join([f"tag:{tag}" for tag in tags])
-            tag_cards = mw.col.find_cards(tag_query)
-            related_cards.extend(tag_cards)
+        tag_query = " or ".join(search_term('tag', tag) for tag in tags if tag)
+        tag_ids = set(mw.col.find_cards(tag_query)) - current if tag_query else set()
         
         # Find by deck
-        deck_cards = mw.col.find_cards(f"deck:{mw.col.decks.name(self.current_card.did)}")
-        related_cards.extend(deck_cards)
+        deck_ids = set(mw.col.find_cards(search_term('deck', self._card_cache['deck']))) - current
         
-        # Remove current card and duplicates
-        related_cards = list(set(related_cards))
-        if self.current_card.id in related_cards:
-            related_cards.remove(self.current_card.id)
+        # Union drops duplicates; the current card was removed from both sides
+        related_cards = tag_ids | deck_ids
         
         # Get some sample content
         samples = []
-        for cid in related_cards[:3]:
+        for cid in islice(related_cards, 3):
             card = mw.col.get_card(cid)
             if card:
                 samples.append(self.clean_html(card.question())[:50] + "...")
@@ -3989,8 +4119,8 @@ class AnkiVoiceReviewServer:
         return {
             "count": len(related_cards),
             "summary": summary,
-            "tag_matches": len([c for c in related_cards if any(tag in mw.col.get_card(c).note().tags for tag in tags)]) if tags else 0,
-            "deck_matches": len(deck_cards)
+            "tag_matches": len(tag_ids),
+            "deck_matches": len(deck_ids)
         }
     
     def _get_rating_guidance(self) -> str:
@@ -4004,35 +4134,11 @@ class AnkiVoiceReviewServer:
     
     def _generate_feedback_message(self, ease: int, rating: str) -> str:
         """Generate encouraging feedback based on rating"""
-        messages = {
-            1: [
-                f"No worries! Marked as '{rating}'. Everyone forgets sometimes.",
-                f"That's okay! We'll see this one again soon.",
-                f"Don't worry about it. Repetition is how we learn!"
-            ],
-            2: [
-                f"Good effort! Marked as '{rating}'.",
-                f"Nice try! You're getting there.",
-                f"Keep working on it. You're making progress!"
-            ],
-            3: [
-                f"Well done! Marked as '{rating}'.",
-                f"Great job! You got it!",
-                f"Excellent! Your memory is working well."
-            ],
-            4: [
-                f"Perfect! Marked as '{rating}'.",
-                f"Outstanding! That was easy for you.",
-                f"Brilliant! You've mastered this one."
-            ]
-        }
-        
-        import random
-        return random.choice(messages[ease])
+        return random.choice(FEEDBACK_MESSAGES[ease - 1]).format(rating=rating)
     
     def _get_session_start_stats(self) -> Dict[str, Any]:
         """Get statistics when starting a session"""
-        counts = mw.col.sched.counts()
+        counts = self._sched_counts()
         total = sum(counts)
         
         message_parts = []
@@ -4053,17 +4159,24 @@ class AnkiVoiceReviewServer:
             "total": total
         }
     
-    def _get_session_summary(self) -> str:
+    def _get_session_duration(self, now: Optional[datetime] = None) -> timedelta:
+        """Active (unpaused) time of the current session"""
+        if now is None:
+            now = datetime.now()
+        return now - self.current_session.start_time - self.current_session.paused_duration
+    
+    def _get_session_summary(self, duration: Optional[timedelta] = None) -> str:
         """Generate session summary"""
         if not self.current_session:
             return "No session data available."
         
-        duration = datetime.now() - self.current_session.start_time - self.current_session.paused_duration
+        if duration is None:
+            duration = self._get_session_duration()
         minutes = int(duration.total_seconds() / 60)
         
         accuracy = 0
         if self.current_session.cards_reviewed > 0:
-            accuracy = round(self.current_session.correct_count / self.current_session.cards_reviewed * 100)
+            accuracy = percent(self.current_session.correct_count, self.current_session.cards_reviewed)
         
         summary_parts = [
             f"You reviewed {self.current_session.cards_reviewed} cards in {minutes} minutes",
@@ -4093,38 +4206,27 @@ class AnkiVoiceReviewServer:
         else:  # all time
             start_time = datetime(2000, 1, 1)
         
-        # Query review log
-        reviews = self.db.execute('''
-            SELECT COUNT(*), 
-                   SUM(CASE WHEN user_rating NOT IN ('again', 'repeat', 'forgot') THEN 1 ELSE 0 END),
-                   AVG(time_to_answer_seconds),
-                   SUM(hints_used)
-            FROM review_log
-            WHERE review_time >= ?
-        ''', (start_time,)).fetchone()
-        
-        total_reviews = reviews[0] or 0
-        correct_reviews = reviews[1] or 0
-        avg_time = reviews[2] or 0
-        total_hints = reviews[3] or 0
-        
-        # Query sessions
-        sessions = self.db.execute('''
-            SELECT COUNT(*), 
-                   SUM(cards_reviewed),
-                   AVG(cards_reviewed),
-                   MAX(best_streak)
-            FROM sessions
-            WHERE start_time >= ?
-        ''', (start_time,)).fetchone()
-        
-        total_sessions = sessions[0] or 0
+        # Wait for queued reviews to be written so they count, then read
+        # under the lock the log writer commits with
+        self._log_queue.join()
+        
+        # Review and session aggregates in one statement
+        with self._db_lock:
+            (total_reviews, correct_reviews, avg_time, total_hints,
+             total_sessions, max_streak) = self.db.execute(
+                PERIOD_STATISTICS_SQL, (start_time, start_time)
+            ).fetchone()
+        
+        total_reviews = total_reviews or 0
+        correct_reviews = correct_reviews or 0
+        avg_time = avg_time or 0
+        total_hints = total_hints or 0
+        accuracy = percent(correct_reviews, total_reviews)
         
         # Build summary
         if total_reviews == 0:
             summary = f"No reviews found for {period}."
         else:
-            accuracy = round(correct_reviews / total_reviews * 100)
             summary = f"In the past {period}, you reviewed {total_reviews} cards with {accuracy}% accuracy"
             
             if avg_time > 0:
@@ -4138,93 +4240,131 @@ class AnkiVoiceReviewServer:
             "period": period,
             "total_reviews": total_reviews,
             "correct_reviews": correct_reviews,
-            "accuracy": round(correct_reviews / total_reviews * 100) if total_reviews > 0 else 0,
+            "accuracy": accuracy,
             "average_time": avg_time,
             "total_hints": total_hints,
             "total_sessions": total_sessions,
-            "max_streak": sessions[3] or 0
+            "max_streak": max_streak or 0
         }
     
     def _log_card_review(self, rating: str = None):
-        """Log card review to database"""
+        """Queue the current card's review for the background log writer"""
         if not self.current_card or not self.current_session:
             return
         
         try:
-            question = self.clean_html(self.current_card.question())
-            answer = self.clean_html(self.current_card.answer())
-            time_taken = (datetime.now() - self._current_card_start_time).total_seconds()
-            
-            self.db.execute('''
-                INSERT INTO review_log 
-                (session_id, card_id, question, answer, user_rating, review_time, time_to_answer_seconds, hints_used)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            time_taken = time.monotonic() - self._current_card_start_time
+            self._log_queue.put_nowait((
                 self.current_session.id,
                 self.current_card.id,
-                question[:200],  # Truncate for storage
-                answer[:200],
+                self._card_cache['question'][:200],  # Truncate for storage
+                self._card_cache['answer'][:200],
                 rating,
                 datetime.now(),
                 time_taken,
                 self._hints_used
             ))
-            self.db.commit()
         except Exception as e:
             logger.error(f"Error logging card review: {str(e)}")
     
-    def _end_session(self):
-        """End and save session to database"""
+    def _log_worker(self):
+        """Drain queued reviews and write each batch in one transaction"""
+        while True:
+            rows = [self._log_queue.get()]
+            while True:
+                try:
+                    rows.append(self._log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            taken = len(rows)
+            stop = None in rows
+            rows = [row for row in rows if row is not None]
+            if rows:
+                try:
+                    with self._db_lock:
+                        self.db.executemany(REVIEW_LOG_INSERT, rows)
+                        self.db.commit()
+                except Exception as e:
+                    logger.error(f"Error writing review log: {str(e)}")
+            # Mark the batch done so statistics readers waiting on join() resume
+            for _ in range(taken):
+                self._log_queue.task_done()
+            if stop:
+                return
+    
+    def _end_session(self) -> Optional[str]:
+        """End and save session to database, returning its summary"""
         if not self.current_session:
-            return
+            return None
         
         try:
-            total_duration = (datetime.now() - self.current_session.start_time - self.current_session.paused_duration).total_seconds()
+            now = datetime.now()
+            duration = self._get_session_duration(now)
+            summary = self._get_session_summary(duration)
+            total_duration = duration.total_seconds()
             
-            self.db.execute('''
-                INSERT INTO sessions 
-                (id, start_time, end_time, mode, cards_reviewed, correct_count, best_streak, total_duration_seconds)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                self.current_session.id,
-                self.current_session.start_time,
-                datetime.now(),
-                self.current_session.mode.value,
-                self.current_session.cards_reviewed,
-                self.current_session.correct_count,
-                self.current_session.best_streak,
-                int(total_duration)
-            ))
-            self.db.commit()
+            with self._db_lock:
+                self.db.execute('''
+                    INSERT INTO sessions 
+                    (id, start_time, end_time, mode, cards_reviewed, correct_count, best_streak, total_duration_seconds)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    self.current_session.id,
+                    self.current_session.start_time,
+                    now,
+                    self.current_session.mode.value,
+                    self.current_session.cards_reviewed,
+                    self.current_session.correct_count,
+                    self.current_session.best_streak,
+                    int(total_duration)
+                ))
+                self.db.commit()
             
             self.current_session = None
             self.current_card = None
+            self._card_cache = {}
+            self._counts_cache = None
+            self.clean_html.cache_clear()
+            deck_name.cache_clear()
             self.is_showing_answer = False
+            self._notify_stats_changed()
+            return summary
         except Exception as e:
             logger.error(f"Error ending session: {str(e)}")
+            return None
     
     def start(self):
         """Start the Flask server in a background thread"""
+        # Bind here rather than in the thread so port conflicts surface
+        # immediately, and keep the handle so stop() can shut it down
+        try:
+            logger.info(f"Starting voice review server on {self.config.host}:{self.config.port}")
+            self.http_server = make_server(self.config.host, self.config.port, self.app, threaded=True)
+        except Exception as e:
+            logger.error(f"Server error: {str(e)}")
+            showWarning(f"Failed to start voice review server: {str(e)}")
+            return
+        
         def run_server():
             try:
-                logger.info(f"Starting voice review server on {self.config.host}:{self.config.port}")
-                self.app.run(host=self.config.host, port=self.config.port, debug=False, use_reloader=False)
+                self.http_server.serve_forever()
             except Exception as e:
                 logger.error(f"Server error: {str(e)}")
-                showWarning(f"Failed to start voice review server: {str(e)}")
         
         self.server_thread = threading.Thread(target=run_server, daemon=True)
         self.server_thread.start()
         
-        # Wait a moment and check if server started
-        import time
-        time.sleep(1)
-        
-        # Test server health
+        # Test server health; the socket is already listening, so no need
+        # to wait for the thread before connecting
         try:
-            import requests
-            response = requests.get(f"http://{self.config.host}:{self.config.port}/health", timeout=2)
-            if response.status_code == 200:
+            conn = http.client.HTTPConnection(self.config.host, self.config.port, timeout=2)
+            try:
+                conn.request("GET", "/health")
+                status = conn.getresponse().status
+            finally:
+                conn.close()
+            if status == 200:
                 showInfo(f"Voice Review Server started successfully on http://{self.config.host}:{self.config.port}")
             else:
                 showWarning("Voice Review Server started but health check failed")
@@ -4236,22 +4376,30 @@ class AnkiVoiceReviewServer:
         # Stop WebSocket streaming session
         if self.voice_stream_handler:
             try:
-                self.voice_stream_handler.stop_streaming_session()
-                # Shutdown executor
-                self.voice_stream_handler.executor.shutdown(wait=True)
+                self.voice_stream_handler.shutdown()
                 logger.info("Voice streaming handler stopped")
             except Exception as e:
                 logger.error(f"Error stopping voice stream handler: {e}")
         
+        # End /events/stats streams; shutdown() leaves their threads running
+        with self._stats_changed:
+            self._stopping = True
+            self._stats_changed.notify_all()
+        
         if hasattr(self, 'server_thread'):
-            # Flask doesn't have a clean shutdown in development mode
-            # In production, you'd use a proper WSGI server
             logger.info("Voice review server stopping...")
+            self.http_server.shutdown()
+            self.server_thread.join(timeout=5)
+        
+        # Flush any reviews still waiting for the log writer
+        self._log_queue.put_nowait(None)
+        self._log_thread.join(timeout=5)
 
 # Global instances
 voice_server: Optional[AnkiVoiceReviewServer] = None
 voice_assistant_widget: Optional[VoiceAssistantWidget] = None
 voice_assistant_dialog: Optional[VoiceAssistantDialog] = None
+instructions_dialog: Optional[QDialog] = None
 
 def start_voice_server():
     """Initialize and start the voice review server"""
@@ -4414,6 +4562,19 @@ def show_widget_preferences_dialog():
     
     dialog.exec()
 
+SETUP_INSTRUCTIONS_HTML = """
+<html>
+<body style="font-family: Arial; font-size: 12px;">
+<b>Voice Review Setup:</b><br>
+1. Click "Start Voice Server" to enable webhook endpoints<br>
+2. Use the AI Study Buddy window to review cards with voice<br>
+3. Say natural phrases like "I forgot" or "too easy"<br>
+<br>
+<b>For iPhone/iPad:</b> Open ElevenLabs app → Conversational AI → Select "Anki Study Buddy"
+</body>
+</html>
+"""
+
 def open_config_dialog():
     """Open configuration dialog"""
     dialog = QDialog(mw)
@@ -4489,20 +4650,8 @@ def open_config_dialog():
     layout.addWidget(security_group)
     
     # Instructions
-    instructions = QTextBrowser()
+    instructions = rich_text_label(SETUP_INSTRUCTIONS_HTML)
     instructions.setMaximumHeight(150)
-    instructions.setHtml("""
-    <html>
-    <body style="font-family: Arial; font-size: 12px;">
-    <b>Voice Review Setup:</b><br>
-    1. Click "Start Voice Server" to enable webhook endpoints<br>
-    2. Use the AI Study Buddy window to review cards with voice<br>
-    3. Say natural phrases like "I forgot" or "too easy"<br>
-    <br>
-    <b>For iPhone/iPad:</b> Open ElevenLabs app → Conversational AI → Select "Anki Study Buddy"
-    </body>
-    </html>
-    """)
     layout.addWidget(instructions)
     
     # Buttons
@@ -4513,7 +4662,7 @@ def open_config_dialog():
     
     dialog.setLayout(layout)
     
-    if dialog.exec():
+    def save_config():
         # Save configuration
         config = {
             'port': port_input.value(),
@@ -4524,203 +4673,226 @@ def open_config_dialog():
             'max_requests_per_minute': rate_limit_input.value(),
             'enable_webhook_auth': webhook_auth.isChecked()
         }
-        mw.addonManager.writeConfig(__name__, config)
         
         # Update webhook secret in running server (not saved to config for security)
-        if voice_server and webhook_secret_input.text().strip():
-            voice_server.config.webhook_secret = webhook_secret_input.text().strip()
-            
-        showInfo("Configuration saved. Restart the server for changes to take effect.")
+        secret = webhook_secret_input.text().strip()
+        if voice_server and secret:
+            voice_server.config.webhook_secret = secret
+        
+        # Skip the config write when OK was pressed without changing anything
+        saved = mw.addonManager.getConfig(__name__) or EMPTY_CONFIG
+        if any(saved.get(key) != value for key, value in config.items()):
+            mw.addonManager.writeConfig(__name__, config)
+            showInfo("Configuration saved. Restart the server for changes to take effect.")
+    
+    # open() stays window-modal without spinning a nested event loop like exec()
+    dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+    dialog.accepted.connect(save_config)
+    dialog.open()
+
+# Appended to every reviewer page, so build it once
+VOICE_BUTTON_HTML = """
+<style>
+.voice-button {
+    position: fixed;
+    bottom: 20px;
+    right: 20px;
+    width: 60px;
+    height: 60px;
+    border-radius: 50%;
+    background: #007bff;
+    color: white;
+    border: none;
+    cursor: pointer;
+    box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+    z-index: 1000;
+    font-size: 24px;
+    transition: transform 0.3s ease, background-color 0.3s ease;
+}
+.voice-button:hover {
+    background: #0056b3;
+    transform: scale(1.1);
+}
+.voice-active {
+    background: #28a745;
+}
+/* Pulse a ring behind the button with transform/opacity only, so it stays on the compositor */
+.voice-active::after {
+    content: "";
+    position: absolute;
+    inset: 0;
+    border-radius: 50%;
+    background: #28a745;
+    z-index: -1;
+    animation: pulse 1.5s infinite;
+}
+@keyframes pulse {
+    0% { transform: scale(1); opacity: 0.7; }
+    100% { transform: scale(1.6); opacity: 0; }
+}
+</style>
+
+<button class="voice-button" onclick="pycmd('voice_assistant:toggle')">
+    🎤
+</button>
+"""
 
 def add_voice_button_to_reviewer(web_content, context):
     """Add voice button to reviewer"""
-    if isinstance(context, Reviewer):
-        web_content.body += """
-        <style>
-        .voice-button {
-            position: fixed;
-            bottom: 20px;
-            right: 20px;
-            width: 60px;
-            height: 60px;
-            border-radius: 50%;
-            background: #007bff;
-            color: white;
-            border: none;
-            cursor: pointer;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-            z-index: 1000;
-            font-size: 24px;
-            transition: all 0.3s ease;
-        }
-        .voice-button:hover {
-            background: #0056b3;
-            transform: scale(1.1);
-        }
-        .voice-active {
-            background: #28a745;
-            animation: pulse 1.5s infinite;
-        }
-        @keyframes pulse {
-            0% { box-shadow: 0 0 0 0 rgba(40, 167, 69, 0.7); }
-            70% { box-shadow: 0 0 0 10px rgba(40, 167, 69, 0); }
-            100% { box-shadow: 0 0 0 0 rgba(40, 167, 69, 0); }
-        }
-        </style>
-        
-        <button class="voice-button" onclick="pycmd('voice_assistant:toggle')">
-            🎤
-        </button>
-        """
+    # Fires for every webview; the main window owns the only reviewer
+    if context is None or context is not mw.reviewer:
+        return
+    web_content.body += VOICE_BUTTON_HTML
+
+# pycmd messages this add-on answers; every other webview message passes through
+PYCMD_HANDLERS = {
+    "voice_assistant:toggle": show_voice_assistant_dialog
+}
 
 def handle_pycmd(handled, cmd, context):
     """Handle JavaScript commands"""
-    if cmd == "voice_assistant:toggle":
-        show_voice_assistant_dialog()
+    handler = PYCMD_HANDLERS.get(cmd)
+    if handler:
+        handler()
         return True, None
     return handled
 
+def _menu_label(label: str, plain: bool) -> str:
+    """Drop the leading emoji from a menu label when plain labels are configured"""
+    return label.split(' ', 1)[1] if plain else label
+
+def _populate_menu(menu, spec, plain: bool = False):
+    """Add menu entries in order: (label, slot) actions, (title, spec) submenus, None separators"""
+    for entry in spec:
+        if entry is None:
+            menu.addSeparator()
+            continue
+        label, target = entry
+        label = _menu_label(label, plain)
+        if isinstance(target, tuple):
+            _populate_menu(menu.addMenu(label), target, plain)
+            continue
+        action = QAction(label, mw)
+        action.triggered.connect(target)
+        menu.addAction(action)
+
 def setup_menu():
     """Add menu items"""
-    voice_menu = mw.form.menuTools.addMenu("🎤 Voice Review")
-    
-    # Start server action
-    start_action = QAction("▶️ Start Voice Server", mw)
-    start_action.triggered.connect(start_voice_server)
-    voice_menu.addAction(start_action)
-    
-    # Stop server action
-    stop_action = QAction("⏹️ Stop Voice Server", mw)
-    stop_action.triggered.connect(stop_voice_server)
-    voice_menu.addAction(stop_action)
-    
-    voice_menu.addSeparator()
-    
-    # Widget management submenu
-    widget_menu = voice_menu.addMenu("🎯 AI Assistant")
-    
-    # Show AI assistant (auto-detects preferred type)
-    show_action = QAction("📌 Toggle AI Assistant", mw)
-    show_action.triggered.connect(lambda: widget_manager.toggle_widget())
-    widget_menu.addAction(show_action)
-    
-    widget_menu.addSeparator()
-    
-    # Widget type selection
-    sidebar_action = QAction("📋 Sidebar Widget", mw)
-    sidebar_action.triggered.connect(lambda: switch_widget_type('sidebar'))
-    widget_menu.addAction(sidebar_action)
-    
-    floating_action = QAction("🪟 Floating Widget", mw)
-    floating_action.triggered.connect(lambda: switch_widget_type('floating'))
-    widget_menu.addAction(floating_action)
-    
-    popup_action = QAction("💬 Popup Widget", mw)
-    popup_action.triggered.connect(lambda: switch_widget_type('popup'))
-    widget_menu.addAction(popup_action)
-    
-    widget_menu.addSeparator()
-    
-    # Widget preferences
-    prefs_action = QAction("⚙️ Widget Preferences", mw)
-    prefs_action.triggered.connect(show_widget_preferences_dialog)
-    widget_menu.addAction(prefs_action)
-    
-    voice_menu.addSeparator()
-    
-    # Configuration action
-    config_action = QAction("⚙️ Configure...", mw)
-    config_action.triggered.connect(open_config_dialog)
-    voice_menu.addAction(config_action)
-    
-    voice_menu.addSeparator()
-    
-    # View logs action
-    logs_action = QAction("📋 View Logs", mw)
-    logs_action.triggered.connect(lambda: QDesktopServices.openUrl(QUrl.fromLocalFile(log_file)))
-    voice_menu.addAction(logs_action)
+    # Emoji labels go through Qt's font fallback and shaping; plain ones don't
+    config = mw.addonManager.getConfig(__name__) or EMPTY_CONFIG
+    plain = not config.get('use_emoji_menu', True)
+    
+    _populate_menu(mw.form.menuTools.addMenu(_menu_label("🎤 Voice Review", plain)), (
+        ("▶️ Start Voice Server", start_voice_server),
+        ("⏹️ Stop Voice Server", stop_voice_server),
+        None,
+        # Widget management submenu
+        ("🎯 AI Assistant", (
+            # Show AI assistant (auto-detects preferred type)
+            ("📌 Toggle AI Assistant", partial(widget_manager.toggle_widget, None)),
+            None,
+            ("📋 Sidebar Widget", partial(switch_widget_type, 'sidebar')),
+            ("🪟 Floating Widget", partial(switch_widget_type, 'floating')),
+            ("💬 Popup Widget", partial(switch_widget_type, 'popup')),
+            None,
+            ("⚙️ Widget Preferences", show_widget_preferences_dialog)
+        )),
+        None,
+        ("⚙️ Configure...", open_config_dialog),
+        None,
+        ("📋 View Logs", lambda: QDesktopServices.openUrl(log_url)),
+        ("❓ How to Use", show_instructions)
+    ), plain)
+
+INSTRUCTIONS_HTML = """
+<html>
+<head>
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; padding: 20px; }
+        h2 { color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px; }
+        h3 { color: #34495e; }
+        code { background: #f4f4f4; padding: 2px 5px; border-radius: 3px; }
+        .command { background: #e8f4f8; padding: 5px 10px; border-radius: 5px; margin: 5px 0; }
+        .tip { background: #fff3cd; border-left: 4px solid #ffc107; padding: 10px; margin: 10px 0; }
+    </style>
+</head>
+<body>
+    <h2>🎓 Anki Voice Review with AI Assistant</h2>
+    
+    <h3>🚀 Quick Start</h3>
+    <ol>
+        <li>Click <b>Tools → Voice Review → Start Voice Server</b></li>
+        <li>Open the AI Assistant (Dock or Window)</li>
+        <li>Say "Start session" to begin reviewing</li>
+    </ol>
+    
+    <h3>🗣️ Voice Commands</h3>
+    <div class="command"><b>Starting:</b> "Let's start studying" / "Begin session"</div>
+    <div class="command"><b>Next Card:</b> "Next card" / "Continue" / "Give me another"</div>
+    <div class="command"><b>Show Answer:</b> "Show answer" / "I give up" / "What's the answer"</div>
+    <div class="command"><b>Get Hint:</b> "Give me a hint" / "Help me" / "I need a clue"</div>
+    <div class="command"><b>Rate Card:</b> Natural phrases work!</div>
+    <ul>
+        <li>❌ <b>Again:</b> "I forgot" / "I don't know" / "No idea"</li>
+        <li>😅 <b>Hard:</b> "That was tough" / "Difficult" / "I struggled"</li>
+        <li>✅ <b>Good:</b> "Got it" / "I know this" / "Correct"</li>
+        <li>🎯 <b>Easy:</b> "Too easy" / "Simple" / "Perfect"</li>
+    </ul>
+    
+    <h3>📱 Using on iPhone/iPad</h3>
+    <ol>
+        <li>Download the <b>ElevenLabs</b> app from App Store</li>
+        <li>Open the app and go to <b>Conversational AI</b></li>
+        <li>Find and select <b>"Anki Study Buddy"</b></li>
+        <li>Make sure your Anki desktop is running with the server started</li>
+        <li>Start reviewing hands-free!</li>
+    </ol>
+    
+    <div class="tip">
+        <b>💡 Pro Tip:</b> You can also get a phone number for your Study Buddy in the ElevenLabs dashboard, 
+        allowing you to call and review cards completely hands-free!
+    </div>
     
-    # Instructions action
-    instructions_action = QAction("❓ How to Use", mw)
-    instructions_action.triggered.connect(show_instructions)
-    voice_menu.addAction(instructions_action)
+    <h3>🎯 Review Modes</h3>
+    <ul>
+        <li><b>Normal:</b> Standard review with all features</li>
+        <li><b>Speed:</b> Quick reviews for rapid practice</li>
+        <li><b>Focus:</b> No hints, stricter ratings for serious study</li>
+        <li><b>Practice:</b> Review without affecting card scheduling</li>
+    </ul>
+    
+    <h3>🔧 Troubleshooting</h3>
+    <ul>
+        <li>Make sure the voice server is running (green status)</li>
+        <li>Allow microphone access when prompted</li>
+        <li>Check that port 5000 is not in use by other apps</li>
+        <li>View logs for detailed error messages</li>
+    </ul>
+</body>
+</html>
+"""
 
 def show_instructions():
-    """Show usage instructions"""
+    """Show usage instructions, building the dialog on first use"""
+    global instructions_dialog
+    if not instructions_dialog:
+        instructions_dialog = _build_instructions_dialog()
+    instructions_dialog.show()
+    instructions_dialog.raise_()
+    instructions_dialog.activateWindow()
+
+def _build_instructions_dialog() -> QDialog:
+    """Create the usage instructions dialog; closing it only hides it"""
     dialog = QDialog(mw)
     dialog.setWindowTitle("Voice Review Instructions")
     dialog.setMinimumSize(600, 500)
     
     layout = QVBoxLayout()
     
-    browser = QTextBrowser()
-    browser.setHtml("""
-    <html>
-    <head>
-        <style>
-            body { font-family: Arial, sans-serif; line-height: 1.6; padding: 20px; }
-            h2 { color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px; }
-            h3 { color: #34495e; }
-            code { background: #f4f4f4; padding: 2px 5px; border-radius: 3px; }
-            .command { background: #e8f4f8; padding: 5px 10px; border-radius: 5px; margin: 5px 0; }
-            .tip { background: #fff3cd; border-left: 4px solid #ffc107; padding: 10px; margin: 10px 0; }
-        </style>
-    </head>
-    <body>
-        <h2>🎓 Anki Voice Review with AI Assistant</h2>
-        
-        <h3>🚀 Quick Start</h3>
-        <ol>
-            <li>Click <b>Tools → Voice Review → Start Voice Server</b></li>
-            <li>Open the AI Assistant (Dock or Window)</li>
-            <li>Say "Start session" to begin reviewing</li>
-        </ol>
-        
-        <h3>🗣️ Voice Commands</h3>
-        <div class="command"><b>Starting:</b> "Let's start studying" / "Begin session"</div>
-        <div class="command"><b>Next Card:</b> "Next card" / "Continue" / "Give me another"</div>
-        <div class="command"><b>Show Answer:</b> "Show answer" / "I give up" / "What's the answer"</div>
-        <div class="command"><b>Get Hint:</b> "Give me a hint" / "Help me" / "I need a clue"</div>
-        <div class="command"><b>Rate Card:</b> Natural phrases work!</div>
-        <ul>
-            <li>❌ <b>Again:</b> "I forgot" / "I don't know" / "No idea"</li>
-            <li>😅 <b>Hard:</b> "That was tough" / "Difficult" / "I struggled"</li>
-            <li>✅ <b>Good:</b> "Got it" / "I know this" / "Correct"</li>
-            <li>🎯 <b>Easy:</b> "Too easy" / "Simple" / "Perfect"</li>
-        </ul>
-        
-        <h3>📱 Using on iPhone/iPad</h3>
-        <ol>
-            <li>Download the <b>ElevenLabs</b> app from App Store</li>
-            <li>Open the app and go to <b>Conversational AI</b></li>
-            <li>Find and select <b>"Anki Study Buddy"</b></li>
-            <li>Make sure your Anki desktop is running with the server started</li>
-            <li>Start reviewing hands-free!</li>
-        </ol>
-        
-        <div class="tip">
-            <b>💡 Pro Tip:</b> You can also get a phone number for your Study Buddy in the ElevenLabs dashboard, 
-            allowing you to call and review cards completely hands-free!
-        </div>
-        
-        <h3>🎯 Review Modes</h3>
-        <ul>
-            <li><b>Normal:</b> Standard review with all features</li>
-            <li><b>Speed:</b> Quick reviews for rapid practice</li>
-            <li><b>Focus:</b> No hints, stricter ratings for serious study</li>
-            <li><b>Practice:</b> Review without affecting card scheduling</li>
-        </ul>
-        
-        <h3>🔧 Troubleshooting</h3>
-        <ul>
-            <li>Make sure the voice server is running (green status)</li>
-            <li>Allow microphone access when prompted</li>
-            <li>Check that port 5000 is not in use by other apps</li>
-            <li>View logs for detailed error messages</li>
-        </ul>
-    </body>
-    </html>
-    """)
+    # The guide is long, so let the label scroll inside the dialog
+    browser = QScrollArea()
+    browser.setWidgetResizable(True)
+    browser.setWidget(rich_text_label(INSTRUCTIONS_HTML))
     
     layout.addWidget(browser)
     
@@ -4729,22 +4901,30 @@ def show_instructions():
     layout.addWidget(close_btn)
     
     dialog.setLayout(layout)
-    dialog.exec()
+    return dialog
 
 # Auto-start functionality
 def auto_start():
     """Auto-start server and show assistant if configured"""
-    config = mw.addonManager.getConfig(__name__) or {}
+    config = mw.addonManager.getConfig(__name__) or EMPTY_CONFIG
     
     if config.get('auto_start', False):
-        start_voice_server()
+        # Bind and health-check the server after profile load finishes
+        QTimer.singleShot(0, start_voice_server)
     
     if config.get('show_voice_assistant', True):
         # Show assistant dock after a short delay
-        QTimer.singleShot(1000, lambda: toggle_voice_assistant(True))
+        QTimer.singleShot(1000, partial(toggle_voice_assistant, True))
+
+def on_operation_did_execute(changes, handler):
+    """Refresh pending card counts when Anki's study queues change"""
+    if voice_server and getattr(changes, 'study_queues', True):
+        voice_server.invalidate_card_counts()
 
 # Initialize hooks
-gui_hooks.main_window_did_init.append(setup_menu)
 gui_hooks.webview_will_set_content.append(add_voice_button_to_reviewer)
 gui_hooks.webview_did_receive_js_message.append(handle_pycmd)
-gui_hooks.profile_did_open.append(auto_start)
\ No newline at end of file
+gui_hooks.profile_did_open.append(auto_start)
+# Build the menu once the main window has had a chance to paint
+gui_hooks.main_window_did_init.append(lambda: QTimer.singleShot(0, setup_menu))
+gui_hooks.operation_did_execute.append(on_operation_did_execute)
\ No newline at end of file
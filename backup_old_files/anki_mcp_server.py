@@ -15,9 +15,11 @@ import json
 import logging
 import sqlite3
 import sys
+import time
+from collections import Counter
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence, Union
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 import traceback
 import os
 import tempfile
@@ -47,6 +49,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger("anki-mcp-server")
 
+# Returned for cards whose note type cannot be found
+UNKNOWN_NOTE_TYPE = {'note_type': 'Unknown', 'field_names': [], 'templates': []}
+
+# Seconds a get_deck_stats result is reused before re-running the aggregation
+DECK_STATS_TTL = 30
+
 class AnkiCollection:
     """
     Wrapper for Anki collection operations.
@@ -60,6 +68,12 @@ class AnkiCollection:
         self.collection_path = collection_path
         self.db = None
         self._connected = False
+        # Parsed note type info keyed by model id; note types rarely change
+        # during a session, so each one is decoded at most once per connection
+        self._notetype_cache: Dict[int, Dict[str, Any]] = {}
+        # (timestamp, stats) per deck filter; deck stats change slowly, so
+        # chatty voice sessions can reuse a recent aggregation
+        self._stats_cache: Dict[Optional[str], Tuple[float, Dict[str, Any]]] = {}
         
         # Try to find Anki collection automatically
         if not collection_path:
@@ -100,7 +114,19 @@ class AnkiCollection:
             # Connect to database (read-only for safety)
             self.db = sqlite3.connect(f"file:{self.collection_path}?mode=ro", uri=True)
             self.db.row_factory = sqlite3.Row
+            
+            # Tune for a read-heavy workload: larger page cache, memory-mapped
+            # reads and in-memory temp tables for sorts and aggregations
+            self.db.execute("PRAGMA cache_size = -64000")
+            self.db.execute("PRAGMA mmap_size = 268435456")
+            self.db.execute("PRAGMA temp_store = MEMORY")
+            self.db.execute("PRAGMA query_only = 1")
+            
             self._connected = True
+            
+            # The notetypes table is tiny and read by nearly every card query,
+            # so parse it once up front instead of on first use
+            self._notetype_cache = self._load_note_types()
             logger.info("Successfully connected to Anki collection")
             return True
             
@@ -114,6 +140,8 @@ class AnkiCollection:
             self.db.close()
             self.db = None
         self._connected = False
+        self._notetype_cache.clear()
+        self._stats_cache.clear()
     
     def is_connected(self) -> bool:
         """Check if connected to collection."""
@@ -147,10 +175,11 @@ class AnkiCollection:
             query += " ORDER BY c.due ASC LIMIT ?"
             params.append(limit)
             
-            cursor = self.db.execute(query, params)
+            rows = self.db.execute(query, params).fetchall()
+            note_types = self._get_note_types_bulk(row['mid'] for row in rows)
             cards = []
             
-            for row in cursor.fetchall():
+            for row in rows:
                 # Parse note fields
                 fields = row['flds'].split('\x1f')  # Anki's field separator
                 
@@ -173,7 +202,7 @@ class AnkiCollection:
                 }
                 
                 # Get note type information
-                card_data.update(self._get_note_type_info(row['mid']))
+                card_data.update(note_types.get(row['mid'], UNKNOWN_NOTE_TYPE))
                 cards.append(card_data)
             
             return cards
@@ -184,26 +213,44 @@ class AnkiCollection:
     
     def _get_note_type_info(self, model_id: int) -> Dict[str, Any]:
         """Get note type (model) information."""
+        return self._get_note_types_bulk([model_id]).get(model_id, UNKNOWN_NOTE_TYPE)
+    
+    def _get_note_types_bulk(self, model_ids) -> Dict[int, Dict[str, Any]]:
+        """Get note type information for several models in a single query."""
+        model_ids = set(model_ids)
+        cache = self._notetype_cache
+        missing = [mid for mid in model_ids if mid not in cache]
+        if missing:
+            cache.update(self._load_note_types(missing))
+        return {mid: cache[mid] for mid in model_ids if mid in cache}
+    
+    def _load_note_types(self, model_ids: Optional[List[int]] = None) -> Dict[int, Dict[str, Any]]:
+        """Query and parse the given note types, or all of them when no ids are given."""
         try:
-            cursor = self.db.execute("SELECT name, flds, tmpls FROM notetypes WHERE id = ?", (model_id,))
-            row = cursor.fetchone()
-            
-            if not row:
-                return {'note_type': 'Unknown', 'field_names': [], 'templates': []}
+            query = "SELECT id, name, flds, tmpls FROM notetypes"
+            if model_ids is None:
+                cursor = self.db.execute(query)
+            else:
+                placeholders = ','.join('?' * len(model_ids))
+                cursor = self.db.execute(f"{query} WHERE id IN ({placeholders})", model_ids)
             
-            # Parse field and template information
-            fields_data = json.loads(row['flds'])
-            templates_data = json.loads(row['tmpls'])
+            note_types = {}
+            for row in cursor.fetchall():
+                # Parse field and template information
+                fields_data = json.loads(row['flds'])
+                templates_data = json.loads(row['tmpls'])
+                
+                note_types[row['id']] = {
+                    'note_type': row['name'],
+                    'field_names': [f['name'] for f in fields_data],
+                    'templates': [{'name': t['name'], 'qfmt': t['qfmt'], 'afmt': t['afmt']} for t in templates_data]
+                }
             
-            return {
-                'note_type': row['name'],
-                'field_names': [f['name'] for f in fields_data],
-                'templates': [{'name': t['name'], 'qfmt': t['qfmt'], 'afmt': t['afmt']} for t in templates_data]
-            }
+            return note_types
             
         except Exception as e:
             logger.error(f"Error getting note type info: {e}")
-            return {'note_type': 'Unknown', 'field_names': [], 'templates': []}
+            return {}
     
     def get_card_by_id(self, card_id: int) -> Optional[Dict[str, Any]]:
         """Get a specific card by ID."""
@@ -285,15 +332,16 @@ class AnkiCollection:
             base_query += " LIMIT ?"
             params.append(limit)
             
-            cursor = self.db.execute(base_query, params)
+            rows = self.db.execute(base_query, params).fetchall()
+            note_types = self._get_note_types_bulk(row['mid'] for row in rows)
             cards = []
             
-            for row in cursor.fetchall():
+            for row in rows:
                 fields = row['flds'].split('\x1f')
                 card_data = dict(row)
                 card_data['fields'] = fields
                 card_data['tags'] = row['tags'].split()
-                card_data.update(self._get_note_type_info(row['mid']))
+                card_data.update(note_types.get(row['mid'], UNKNOWN_NOTE_TYPE))
                 cards.append(card_data)
             
             return cards
@@ -307,6 +355,11 @@ class AnkiCollection:
         if not self.is_connected():
             return {}
         
+        now = time.monotonic()
+        cached = self._stats_cache.get(deck_name)
+        if cached and now - cached[0] < DECK_STATS_TTL:
+            return cached[1]
+        
         try:
             # Base query for deck statistics
             query = """
@@ -342,6 +395,7 @@ class AnkiCollection:
                     'average_ease': round((row['avg_ease'] or 2500) / 10, 1)  # Convert to percentage
                 }
             
+            self._stats_cache[deck_name] = (now, stats)
             return stats
             
         except Exception as e:
@@ -375,11 +429,13 @@ class AnkiCollection:
             
             query += " ORDER BY r.id DESC"
             
-            cursor = self.db.execute(query, params)
             reviews = []
             
-            for row in cursor.fetchall():
-                fields = row['flds'].split('\x1f')
+            # Build entries straight from the cursor rather than holding a
+            # fetchall() copy of every row alongside them
+            for row in self.db.execute(query, params):
+                # Only the first field is previewed, so don't split the rest
+                question = row['flds'].split('\x1f', 1)[0]
                 reviews.append({
                     'review_id': row['id'],
                     'card_id': row['cid'],
@@ -392,7 +448,7 @@ class AnkiCollection:
                     'review_type': row['type'],
                     'timestamp': row['id'],
                     'datetime': datetime.fromtimestamp(row['id'] / 1000).isoformat(),
-                    'question_preview': fields[0][:100] if fields else "No content"
+                    'question_preview': question[:100]
                 })
             
             return reviews
@@ -948,7 +1004,9 @@ class AnkiMCPServer:
         
         # Basic statistics
         total_reviews = len(history)
-        correct_reviews = sum(1 for r in history if r['ease'] > 1)
+        ease_counts = Counter(r['ease'] for r in history)
+        again_count, hard_count, good_count, easy_count = (ease_counts[ease] for ease in (1, 2, 3, 4))
+        correct_reviews = hard_count + good_count + easy_count
         accuracy = correct_reviews / total_reviews * 100
         
         avg_time = sum(r['time_ms'] for r in history) / total_reviews / 1000
@@ -976,11 +1034,6 @@ class AnkiMCPServer:
             analysis += f"• Trend: {trend.capitalize()}\n\n"
         
         # Difficulty analysis
-        again_count = sum(1 for r in history if r['ease'] == 1)
-        hard_count = sum(1 for r in history if r['ease'] == 2)
-        good_count = sum(1 for r in history if r['ease'] == 3)
-        easy_count = sum(1 for r in history if r['ease'] == 4)
-        
         analysis += f"🎯 **Difficulty Breakdown:**\n"
         analysis += f"• Again: {again_count} ({again_count/total_reviews*100:.1f}%)\n"
         analysis += f"• Hard: {hard_count} ({hard_count/total_reviews*100:.1f}%)\n"